@@ -61,42 +61,43 @@ async function generateGraphs(marketId: number, marketData: MarketData): Promise
   
   // Generate graphs using Python script
   try {
-    // Create temporary CSV files with market data
+    // Describe all three graphs in one batch manifest (data inline, no CSVs)
     const dataDir = path.join(__dirname, '..', '..', 'graphs', 'data');
     if (!fs.existsSync(dataDir)) {
       fs.mkdirSync(dataDir, { recursive: true });
     }
     
-    // Write market pools data
-    const poolsCsv = path.join(dataDir, `pools_${marketId}.csv`);
-    const poolsContent = `market_id,pool_yes,pool_no,market_title\n${marketId},${marketData.pools.yes},${marketData.pools.no},Market #${marketId}`;
-    fs.writeFileSync(poolsCsv, poolsContent);
-    
-    // Write odds data
-    const oddsCsv = path.join(dataDir, `odds_${marketId}.csv`);
-    const oddsContent = `market_id,odds_yes,odds_no\n${marketId},${marketData.odds.yes},${marketData.odds.no}`;
-    fs.writeFileSync(oddsCsv, oddsContent);
-    
-    // Write leaderboard data
-    const leaderboardCsv = path.join(dataDir, `leaderboard_${marketId}.csv`);
-    let leaderboardContent = 'address,total_staked\n';
-    marketData.leaderboard.forEach(entry => {
-      leaderboardContent += `${entry.address},${entry.staked}\n`;
-    });
-    fs.writeFileSync(leaderboardCsv, leaderboardContent);
+    const manifest = {
+      jobs: [
+        {
+          type: 'pools',
+          data: [{ market_id: marketId, pool_yes: marketData.pools.yes, pool_no: marketData.pools.no, market_title: `Market #${marketId}` }],
+          output: path.join(graphsDir, poolsFile)
+        },
+        {
+          type: 'odds',
+          data: [{ market_id: marketId, odds_yes: marketData.odds.yes, odds_no: marketData.odds.no }],
+          output: path.join(graphsDir, oddsFile)
+        },
+        {
+          type: 'leaderboard',
+          data: marketData.leaderboard.map(entry => ({ address: entry.address, total_staked: entry.staked })),
+          output: path.join(graphsDir, leaderboardFile)
+        }
+      ]
+    };
+    const manifestFile = path.join(dataDir, `batch_${marketId}_${timestamp}.json`);
+    fs.writeFileSync(manifestFile, JSON.stringify(manifest));
     
-    // Run Python scripts to generate graphs
+    // Run the Python script once for all graphs
     const pythonPath = 'python'; // Assuming Python is in PATH
     const graphsScript = path.join(__dirname, '..', '..', 'graphs', 'generate_graph.py');
     
-    // Generate pools chart
-    await execPromise(`${pythonPath} ${graphsScript} --type pools --data ${poolsCsv} --output ${path.join(graphsDir, poolsFile)}`);
-    
-    // Generate odds chart
-    await execPromise(`${pythonPath} ${graphsScript} --type odds --data ${oddsCsv} --output ${path.join(graphsDir, oddsFile)}`);
-    
-    // Generate leaderboard chart
-    await execPromise(`${pythonPath} ${graphsScript} --type leaderboard --data ${leaderboardCsv} --output ${path.join(graphsDir, leaderboardFile)}`);
+    try {
+      await execPromise(`${pythonPath} ${graphsScript} --manifest ${manifestFile}`);
+    } finally {
+      fs.unlinkSync(manifestFile);
+    }
     
     // Return URLs to the generated graphs
     const baseUrl = '/graphs/generated'; // This should match the static file serving setup
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Map-reduce aggregation of bets for StaticFruit graphs.
+
+Each shard produces partial aggregates (pool sums per market+outcome,
+per-user totals, per-day bet counts and odds sums/counts); partials are
+merged by summing (first/last bet times by min/max), so the result is the
+same for any number of shards (up to floating-point summation order).
+Shards split bets by market_id, so a user's distinct-market count is also
+a plain sum across shards.
+
+With workers > 1 the bets are split by market_id hash across a process pool.
+Only these sums are sharded: odds, settlement, per-user medians/PnL and
+calibration still run in the parent. The parent also slices and pickles
+every shard serially (users travel as integer codes), so sharding only pays
+off on large inputs with several cores; on one core it is slower.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+SHARD_COLUMNS = ["market_id", "ts", "user", "bet_amount", "outcome", "date", "odds_yes_estimate"]
+# How each per-user column merges across shards (anything else is summed)
+USER_MERGE = {"first_ts": "min", "last_ts": "max"}
+
+
+def partial_aggregates(bets):
+    """Partial aggregates for one shard of bets (`user` as integer codes)."""
+    pools = bets.groupby(["market_id", "outcome"], observed=True)["bet_amount"].sum()
+    users = bets.assign(yes_stake=bets["bet_amount"].where(bets["outcome"] == 1, 0.0)).groupby("user").agg(
+        bets=("bet_amount", "size"),
+        bet_amount=("bet_amount", "sum"),
+        yes_stake=("yes_stake", "sum"),
+        markets=("market_id", "nunique"),
+        first_ts=("ts", "min"),
+        last_ts=("ts", "max"),
+    )
+    by_day = bets.groupby(["market_id", "date"])
+    daily = by_day.size().rename("bets").to_frame()
+    if "odds_yes_estimate" in bets.columns:
+        daily["odds_sum"] = by_day["odds_yes_estimate"].sum()
+        daily["odds_count"] = by_day["odds_yes_estimate"].count()
+    return {"pools": pools, "users": users, "daily": daily}
+
+
+def merge_partials(parts):
+    """Combine shard partials; every field is a sum, min or max, so the merge is exact."""
+    merged = {}
+    for key in ("pools", "users", "daily"):
+        frames = [p[key] for p in parts]
+        combined = pd.concat(frames)
+        grouped = combined.groupby(level=list(range(combined.index.nlevels)), observed=True)
+        if key == "users":
+            merged[key] = grouped.agg({c: USER_MERGE.get(c, "sum") for c in combined.columns})
+        else:
+            merged[key] = grouped.sum()
+    return merged
+
+
+def user_codes(users):
+    """Integer codes and the user for each code (categorical codes are reused as-is)."""
+    if isinstance(users.dtype, pd.CategoricalDtype):
+        return users.cat.codes.to_numpy(), users.cat.categories
+    codes, uniques = pd.factorize(users)
+    return codes, pd.Index(uniques)
+
+
+def shard_bets(bets, n):
+    """Split bets into n shards by market_id hash, keeping only the columns workers need."""
+    cols = [c for c in SHARD_COLUMNS if c in bets.columns]
+    keys = bets["market_id"].to_numpy() % n
+    shards = []
+    for i in range(n):
+        shard = bets.loc[keys == i, cols]
+        if len(shard):
+            shards.append(shard)
+    return shards
+
+
+def aggregate(bets, workers=1):
+    """Return pools (market_id, outcome, bet_amount), user_totals (user, bets, bet_amount,
+    yes_stake, markets, first_ts, last_ts) and daily (market_id, date, bets[, odds_yes_estimate]) frames."""
+    codes, users = user_codes(bets["user"])
+    bets = bets[[c for c in SHARD_COLUMNS if c in bets.columns]].assign(user=codes)
+    if workers > 1 and len(bets):
+        shards = shard_bets(bets, workers)
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as ex:
+            parts = list(ex.map(partial_aggregates, shards))
+    else:
+        parts = [partial_aggregates(bets)]
+    merged = merge_partials(parts)
+
+    daily = merged["daily"]
+    if "odds_sum" in daily.columns:
+        # days with no estimates stay NaN, like a plain groupby mean
+        daily["odds_yes_estimate"] = daily["odds_sum"] / daily["odds_count"].where(daily["odds_count"] > 0)
+        daily = daily.drop(columns=["odds_sum", "odds_count"])
+    user_totals = merged["users"].sort_index().reset_index()
+    user_totals = user_totals[user_totals["user"] >= 0].reset_index(drop=True)   # -1: missing user
+    user_totals["user"] = users.take(user_totals["user"].to_numpy()).astype(str)
+    return {
+        "pools": merged["pools"].reset_index(),
+        "user_totals": user_totals,
+        "daily": daily.reset_index(),
+    }
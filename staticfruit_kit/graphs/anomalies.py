@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Online whale / anomaly detection for StaticFruit bets.
+
+Every bet is checked against O(1) rolling state and then folded into it:
+  whale       log-stake z-score against a per-market EWMA mean/variance
+  burst       an address placing `burst_count` bets within `burst_window` seconds
+  odds_swing  pool-implied P(YES) moving by `swing_threshold` or more in one bet
+
+Usage:
+  # follow the append-only bet log (see bet_log.py), appending flags as JSON lines
+  python anomalies.py follow --log sf_log --feed sf_anomalies.jsonl
+  # or via the report: python staticfruit_graphs_live.py ... --anomalies
+"""
+import os
+import sys
+import time
+import json
+import math
+import argparse
+from collections import deque
+import pandas as pd
+
+
+class AnomalyDetector:
+    def __init__(self, alpha=0.05, z_threshold=4.0, min_bets=20,
+                 burst_window=60, burst_count=10, swing_threshold=0.15):
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.min_bets = min_bets
+        self.burst_window_ns = int(burst_window * 1e9)
+        self.burst_count = burst_count
+        self.swing_threshold = swing_threshold
+        self.markets = {}       # market_id -> [n, ewma_mean, ewma_var, pool_yes, pool_total]
+        self.recent = {}        # user -> deque of last `burst_count` bet times (ns)
+        self.last_burst = {}    # user -> time of last burst flag, to flag once per window
+
+    def update(self, ts, market_id, user, amount, outcome):
+        """Check one bet (ts in ns since epoch) against the rolling state; returns a list of flags."""
+        flags = []
+        m = self.markets.get(market_id)
+        if m is None:
+            m = self.markets[market_id] = [0, 0.0, 0.0, 0.0, 0.0]
+        n, mean, var, pool_yes, pool_total = m
+
+        # Whale: compare before updating, so a bet never dilutes its own score
+        x = math.log1p(amount)
+        if n >= self.min_bets and var > 0:
+            z = (x - mean) / math.sqrt(var)
+            if z >= self.z_threshold:
+                flags.append(("whale", z))
+        if n == 0:
+            mean = x
+        else:
+            diff = x - mean
+            incr = self.alpha * diff
+            mean += incr
+            var = (1 - self.alpha) * (var + diff * incr)
+
+        # Odds swing on the pool-implied probability
+        p_before = pool_yes / pool_total if pool_total > 0 else None
+        pool_total += amount
+        if outcome == 1:
+            pool_yes += amount
+        if p_before is not None and n >= self.min_bets:
+            swing = pool_yes / pool_total - p_before
+            if abs(swing) >= self.swing_threshold:
+                flags.append(("odds_swing", swing))
+        m[:] = [n + 1, mean, var, pool_yes, pool_total]
+
+        # Burst: the last `burst_count` bets from this address all fall inside the window
+        times = self.recent.get(user)
+        if times is None:
+            times = self.recent[user] = deque(maxlen=self.burst_count)
+        times.append(ts)
+        if len(times) == self.burst_count and ts - times[0] <= self.burst_window_ns:
+            if ts - self.last_burst.get(user, -self.burst_window_ns - 1) > self.burst_window_ns:
+                self.last_burst[user] = ts
+                flags.append(("burst", float(self.burst_count)))
+
+        return [{"ts": ts, "market_id": market_id, "user": user, "bet_amount": amount,
+                 "kind": kind, "score": score} for kind, score in flags]
+
+    def run(self, bets):
+        """Feed a time-ordered bets frame through the detector; returns the flags as a DataFrame."""
+        ts = bets["ts"].to_numpy(dtype="datetime64[ns]").astype("int64")
+        rows = zip(ts.tolist(), bets["market_id"].tolist(), bets["user"].astype(str).tolist(),
+                   bets["bet_amount"].astype(float).tolist(), bets["outcome"].tolist())
+        flags = [f for row in rows for f in self.update(*row)]
+        out = pd.DataFrame(flags, columns=["ts", "market_id", "user", "bet_amount", "kind", "score"])
+        # typed even when nothing is flagged, so callers can sort/rank the empty frame
+        return out.astype({"ts": "datetime64[ns]", "market_id": "int64", "user": "object",
+                           "bet_amount": "float64", "kind": "object", "score": "float64"})
+
+
+def follow(log_dir, feed, poll=1.0, from_start=False, **detector_args):
+    """Tail the bet log, writing each flag to `feed` as a JSON line as soon as it is seen."""
+    import bet_log
+    detector = AnomalyDetector(**detector_args)
+    users = []
+    pos = 0 if from_start else len(bet_log.open_log(log_dir))
+    while True:
+        rec = bet_log.open_log(log_dir)
+        if len(rec) > pos:
+            new = rec[pos:]
+            if new["user"].max() >= len(users):
+                users = bet_log._read_users(os.path.join(log_dir, "users.txt"))
+            with open(feed, "a", encoding="utf-8") as f:
+                for r in new:
+                    for flag in detector.update(int(r["ts"]), int(r["market_id"]), users[r["user"]],
+                                                float(r["bet_amount"]), int(r["outcome"])):
+                        flag["ts"] = pd.Timestamp(flag["ts"], unit="ns").isoformat() + "Z"
+                        f.write(json.dumps(flag) + "\n")
+            pos = len(rec)
+        del rec
+        time.sleep(poll)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="StaticFruit streaming anomaly detector")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ap_follow = sub.add_parser("follow", help="Follow an append-only bet log")
+    ap_follow.add_argument("--log", required=True, help="Bet log directory")
+    ap_follow.add_argument("--feed", default="sf_anomalies.jsonl", help="JSON lines output")
+    ap_follow.add_argument("--poll", type=float, default=1.0, help="Seconds between log checks")
+    ap_follow.add_argument("--from-start", action="store_true", help="Replay the whole log first")
+    ap_follow.add_argument("--z-threshold", type=float, default=4.0)
+    ap_follow.add_argument("--burst-window", type=float, default=60, help="Seconds")
+    ap_follow.add_argument("--burst-count", type=int, default=10)
+    ap_follow.add_argument("--swing-threshold", type=float, default=0.15)
+    args = ap.parse_args()
+
+    try:
+        follow(args.log, args.feed, poll=args.poll, from_start=args.from_start,
+               z_threshold=args.z_threshold, burst_window=args.burst_window,
+               burst_count=args.burst_count, swing_threshold=args.swing_threshold)
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Append-only binary bet log for StaticFruit graphs.
+
+Layout:
+  <dir>/bets.bin   16-byte header + fixed-width RECORD_DTYPE records
+  <dir>/users.txt  interned user addresses, one per line (line number = user code)
+  <dir>/.lock      writers' lock file
+
+Writers only ever append; readers np.memmap the file and see every complete
+record without parsing anything. Market IDs are already integers and are
+stored as-is.
+
+Writers take an exclusive lock on <dir>/.lock (fcntl.flock), so several
+appenders can share a log; where fcntl is unavailable (Windows) only one
+writer may append at a time. A record left partial by a writer that died
+mid-append (or a partial line in users.txt) is cut off by the next append,
+before it writes.
+
+Usage:
+  python bet_log.py append --log sf_log --bets new_bets.csv
+  some_collector | python bet_log.py append --log sf_log --bets -   # JSON lines
+  python staticfruit_graphs_live.py --mode log --log sf_log
+"""
+import os
+import sys
+import argparse
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, keep to a single writer
+    fcntl = None
+
+MAGIC = b"SFBETS01" + b"\0" * 8
+HEADER_SIZE = len(MAGIC)
+RECORD_DTYPE = np.dtype([
+    ("ts", "<i8"),                 # ns since epoch, UTC
+    ("market_id", "<i8"),
+    ("bet_amount", "<f8"),
+    ("user", "<u4"),               # line number in users.txt
+    ("odds_yes_estimate", "<f4"),  # NaN when unknown
+    ("outcome", "i1"),
+])
+
+
+def _paths(log_dir):
+    return os.path.join(log_dir, "bets.bin"), os.path.join(log_dir, "users.txt")
+
+
+@contextmanager
+def _writer_lock(log_dir):
+    with open(os.path.join(log_dir, ".lock"), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _read_users(users_path):
+    if not os.path.exists(users_path):
+        return []
+    with open(users_path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def _epoch_ns(ts):
+    if pd.api.types.is_numeric_dtype(ts):
+        unit = "ms" if ts.abs().max() > 1e11 else "s"
+        ts = pd.to_datetime(ts, unit=unit, utc=True)
+    elif not pd.api.types.is_datetime64_any_dtype(ts):
+        ts = pd.to_datetime(ts, format="ISO8601", utc=True)
+    elif ts.dt.tz is None:
+        ts = ts.dt.tz_localize("UTC")
+    return ts.dt.tz_convert("UTC").dt.tz_localize(None).astype("datetime64[ns]").astype("int64").to_numpy()
+
+
+def append(log_dir, bets):
+    """Append bets (ts, market_id, user, bet_amount, outcome[, odds_yes_estimate]) to the log."""
+    os.makedirs(log_dir, exist_ok=True)
+    if "amount" in bets.columns and "bet_amount" not in bets.columns:
+        bets = bets.rename(columns={"amount": "bet_amount"})
+    with _writer_lock(log_dir):
+        return _append(log_dir, bets)
+
+
+def _drop_partial_line(users_path):
+    # A user written without its newline was never referenced by a record
+    if not os.path.exists(users_path):
+        return
+    with open(users_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def _append(log_dir, bets):
+    bets_path, users_path = _paths(log_dir)
+    # Intern new users first, so any record a reader can see has a known user code
+    _drop_partial_line(users_path)
+    users = _read_users(users_path)
+    codes = {u: i for i, u in enumerate(users)}
+    new_users = [u for u in pd.unique(bets["user"].astype(str)) if u not in codes]
+    if new_users:
+        with open(users_path, "a", encoding="utf-8") as f:
+            f.write("".join(u + "\n" for u in new_users))
+        codes.update({u: len(users) + i for i, u in enumerate(new_users)})
+
+    rec = np.empty(len(bets), dtype=RECORD_DTYPE)
+    rec["ts"] = _epoch_ns(bets["ts"])
+    rec["market_id"] = bets["market_id"].to_numpy()
+    rec["bet_amount"] = bets["bet_amount"].to_numpy(dtype="float64")
+    rec["user"] = bets["user"].astype(str).map(codes).to_numpy()
+    rec["odds_yes_estimate"] = (bets["odds_yes_estimate"].to_numpy(dtype="float32")
+                                if "odds_yes_estimate" in bets.columns else np.nan)
+    rec["outcome"] = bets["outcome"].to_numpy()
+
+    with open(bets_path, "ab") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size < HEADER_SIZE:
+            f.truncate(0)
+            f.write(MAGIC)
+        else:
+            # Cut off a partial record left by a writer that died mid-append;
+            # writing after it would shift every later record
+            whole = HEADER_SIZE + (size - HEADER_SIZE) // RECORD_DTYPE.itemsize * RECORD_DTYPE.itemsize
+            if whole != size:
+                f.truncate(whole)
+        f.write(rec.tobytes())
+    return len(rec)
+
+
+def open_log(log_dir):
+    """Memory-map every complete record currently in the log (read-only, zero-copy)."""
+    bets_path, _ = _paths(log_dir)
+    if not os.path.exists(bets_path):
+        raise SystemExit(f"No bet log at {log_dir}; create it with: python bet_log.py append --log {log_dir} --bets ...")
+    with open(bets_path, "rb") as f:
+        if f.read(HEADER_SIZE) != MAGIC:
+            raise SystemExit(f"{bets_path} is not a StaticFruit bet log")
+    # A writer may be mid-append; only map whole records
+    n = (os.path.getsize(bets_path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+    if n == 0:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return np.memmap(bets_path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(n,))
+
+
+def read(log_dir, market_ids=None, since=None, until=None):
+    """Load the log as a bets DataFrame, filtering on the mapped arrays before copying."""
+    rec = open_log(log_dir)
+    # Read users after mapping the records: every mapped record's user is already interned
+    users = _read_users(_paths(log_dir)[1])
+
+    mask = np.ones(len(rec), dtype=bool)
+    if market_ids:
+        mask &= np.isin(rec["market_id"], market_ids)
+    if since is not None:
+        mask &= rec["ts"] >= since.value
+    if until is not None:
+        mask &= rec["ts"] < until.value
+    if not mask.all():
+        rec = rec[mask]
+
+    bets = pd.DataFrame({
+        "ts": np.asarray(rec["ts"]).view("datetime64[ns]"),
+        "market_id": np.asarray(rec["market_id"]),
+        "user": pd.Categorical.from_codes(np.asarray(rec["user"]).astype("int32"), categories=users),
+        "bet_amount": np.asarray(rec["bet_amount"]),
+        "outcome": np.asarray(rec["outcome"]),
+        "odds_yes_estimate": np.asarray(rec["odds_yes_estimate"]).astype("float64"),
+    })
+    if bets["odds_yes_estimate"].isna().all():
+        bets = bets.drop(columns=["odds_yes_estimate"])
+    return bets
+
+
+def main():
+    ap = argparse.ArgumentParser(description="StaticFruit append-only bet log")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ap_append = sub.add_parser("append", help="Append bets to the log")
+    ap_append.add_argument("--log", required=True, help="Log directory")
+    ap_append.add_argument("--bets", required=True, help="CSV path, or - for JSON lines on stdin")
+    args = ap.parse_args()
+
+    if args.bets == "-":
+        bets = pd.read_json(sys.stdin, lines=True)
+    else:
+        bets = pd.read_csv(args.bets)
+    n = append(args.log, bets)
+    print(f"Appended {n} bets to {args.log}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Partitioned local bet store for StaticFruit graphs.
+
+Layout:
+  <root>/markets.parquet
+  <root>/bets/market_id=<id>/day=<YYYY-MM-DD>/*.parquet
+
+Reads only open the partitions matching the market / time filters, so a
+one-market or one-week report touches a small slice of history.
+Requires: pip install pyarrow
+"""
+import os
+import pandas as pd
+
+
+def _arrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+    except ImportError:
+        raise SystemExit("The bet store requires pyarrow: pip install pyarrow")
+    return pa, ds
+
+
+def _partitioning(pa, ds):
+    return ds.partitioning(pa.schema([("market_id", pa.int64()), ("day", pa.string())]), flavor="hive")
+
+
+def write(root, markets, bets):
+    """Write markets and bets into the store, replacing only the partitions present in `bets`.
+
+    `bets` must hold every bet of each (market, day) it touches. Markets are
+    merged into markets.parquet by market_id (new rows win).
+    """
+    pa, ds = _arrow()
+    os.makedirs(root, exist_ok=True)
+    markets_path = os.path.join(root, "markets.parquet")
+    if os.path.exists(markets_path):
+        existing = pd.read_parquet(markets_path)
+        existing = existing[~existing["market_id"].isin(markets["market_id"])]
+        if len(existing):
+            markets = pd.concat([existing, markets], ignore_index=True).sort_values("market_id", kind="stable")
+    markets.to_parquet(markets_path, index=False)
+
+    frame = bets.copy()
+    for col in frame.select_dtypes("category").columns:
+        frame[col] = frame[col].astype(object)
+    frame["market_id"] = frame["market_id"].astype("int64")
+    frame["day"] = frame["ts"].dt.strftime("%Y-%m-%d")
+    ds.write_dataset(
+        pa.Table.from_pandas(frame, preserve_index=False),
+        os.path.join(root, "bets"),
+        format="parquet",
+        partitioning=_partitioning(pa, ds),
+        existing_data_behavior="delete_matching",
+    )
+
+
+def read(root, market_ids=None, since=None, until=None):
+    """Load markets and bets from the store. `since` is inclusive, `until` exclusive."""
+    pa, ds = _arrow()
+    markets_path = os.path.join(root, "markets.parquet")
+    bets_path = os.path.join(root, "bets")
+    if not os.path.exists(markets_path) or not os.path.isdir(bets_path):
+        raise SystemExit(f"No bet store at {root}; populate it with a rest/pg/csv run using --store")
+
+    markets = pd.read_parquet(markets_path)
+    dataset = ds.dataset(bets_path, format="parquet", partitioning=_partitioning(pa, ds))
+
+    # Partition keys (market_id, day) prune directories; ts trims within a day
+    filters = []
+    if market_ids:
+        filters.append(ds.field("market_id").isin([int(m) for m in market_ids]))
+        markets = markets[markets["market_id"].isin(market_ids)]
+    if since is not None:
+        filters.append(ds.field("day") >= since.strftime("%Y-%m-%d"))
+        filters.append(ds.field("ts") >= since.to_pydatetime())
+    if until is not None:
+        filters.append(ds.field("day") <= until.strftime("%Y-%m-%d"))
+        filters.append(ds.field("ts") < until.to_pydatetime())
+    expr = None
+    for f in filters:
+        expr = f if expr is None else expr & f
+
+    bets = dataset.to_table(filter=expr).to_pandas()
+    bets = bets.drop(columns=["day"])
+    # partition keys come back last; restore the loader column order
+    bets.insert(1, "market_id", bets.pop("market_id"))
+    return markets.reset_index(drop=True), bets
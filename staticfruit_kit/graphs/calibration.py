@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Forecast scoring for StaticFruit odds.
+
+Every bet carries a forecast of P(YES) at the time it was placed: the stored
+`odds_yes_estimate` (when present) and the pool-implied odds just before
+the bet (so a bet is never scored on a pool that already includes it; each
+market's first bet has no pool forecast, unless a --since window left it
+the pools from before).
+Once a market resolves, each forecast is scored against the outcome:
+
+  brier     (p - y)^2, lower is better, 0.25 for an always-50% forecast
+  log_loss  -(y log p + (1 - y) log(1 - p)), with p clipped away from 0 and 1
+  reliability  forecasts binned by p; a calibrated source has the observed
+               YES rate in each bin close to the bin's mean forecast
+
+Scores are reported overall, per market and per time-to-deadline bucket.
+Everything is column arithmetic and grouped means over all bets at once.
+"""
+import numpy as np
+import pandas as pd
+
+# Forecast sources: column in the joined frame -> label
+SOURCES = {"odds_yes_estimate": "estimate", "p_yes": "pool"}
+DEADLINE_BUCKETS = [0, 1, 6, 24, 72, 168, np.inf]   # hours before the deadline
+DEADLINE_LABELS = ["<1h", "1-6h", "6-24h", "1-3d", "3-7d", ">7d"]
+EPS = 1e-6
+
+
+def _no_forecasts():
+    return pd.DataFrame({
+        "market_id": pd.Series(dtype="int64"), "ts": pd.Series(dtype="datetime64[ns]"),
+        "source": pd.Categorical([], categories=list(SOURCES.values())), "p": pd.Series(dtype="float64"),
+        "y": pd.Series(dtype="int8"), "to_deadline": pd.Categorical([], categories=DEADLINE_LABELS),
+    })
+
+
+def forecasts(bets, markets, odds_history=None):
+    """Long frame of scored forecasts (market_id, ts, source, p, y, to_deadline) for resolved markets.
+
+    `odds_history` is odds.implied_odds(bets, markets), if already computed for time-ordered bets.
+    """
+    if "resolved_outcome" not in markets.columns:
+        return _no_forecasts()
+    if not bets["ts"].is_monotonic_increasing:
+        bets = bets.sort_values("ts", kind="stable")
+        odds_history = None
+    if odds_history is None:
+        import odds
+        odds_history = odds.implied_odds(bets, markets)
+    m = markets.set_index("market_id")
+    resolution = m["resolved_outcome"]
+
+    # odds_history is in the same (time) order as bets; align on position
+    frame = pd.DataFrame({
+        "market_id": bets["market_id"].to_numpy(),
+        "ts": bets["ts"].to_numpy(),
+        "p_yes": odds_history["p_yes"].to_numpy(),
+    })
+    # p_yes is after each bet; the forecast a bet was placed against is the previous one
+    first = ~frame["market_id"].duplicated()
+    frame["p_yes"] = frame.groupby("market_id", sort=False)["p_yes"].shift()
+    if "open_pool_yes" in m.columns:
+        # after a --since filter, a market's first bet still has the pools from before it
+        open_total = m["open_pool_yes"] + m["open_pool_no"]
+        frame.loc[first, "p_yes"] = frame.loc[first, "market_id"].map(
+            m["open_pool_yes"] / open_total.where(open_total > 0))
+    if "odds_yes_estimate" in bets.columns:
+        frame["odds_yes_estimate"] = bets["odds_yes_estimate"].to_numpy()
+    frame["y"] = frame["market_id"].map(resolution)
+    frame = frame[frame["y"].notna()]
+    if frame.empty:
+        return _no_forecasts()
+
+    if "deadline" in m.columns:
+        hours = (frame["market_id"].map(m["deadline"]) - frame["ts"]) / pd.Timedelta(hours=1)
+        to_deadline = pd.cut(hours, DEADLINE_BUCKETS, labels=DEADLINE_LABELS, right=False)
+    else:
+        to_deadline = pd.Categorical([None] * len(frame), categories=DEADLINE_LABELS)
+    frame["to_deadline"] = to_deadline
+
+    columns = [c for c in SOURCES if c in frame.columns]
+    long = frame.melt(id_vars=["market_id", "ts", "y", "to_deadline"], value_vars=columns,
+                      var_name="source", value_name="p").dropna(subset=["p"])
+    long["source"] = long["source"].map(SOURCES).astype("category")
+    long["y"] = long["y"].astype("int8")
+    return long[["market_id", "ts", "source", "p", "y", "to_deadline"]].reset_index(drop=True)
+
+
+def scores(f):
+    """Brier score and log loss overall, per market and per time-to-deadline bucket (long form)."""
+    p = f["p"].to_numpy(dtype="float64").clip(EPS, 1 - EPS)
+    y = f["y"].to_numpy(dtype="float64")
+    scored = f[["source", "market_id", "to_deadline"]].assign(
+        brier=(p - y) ** 2,
+        log_loss=-(y * np.log(p) + (1 - y) * np.log1p(-p)),
+    )
+    parts = []
+    for level, by in (("overall", None), ("market", "market_id"), ("to_deadline", "to_deadline")):
+        keys = ["source"] + ([by] if by else [])
+        g = scored.groupby(keys, observed=True).agg(n=("brier", "size"), brier=("brier", "mean"),
+                                                    log_loss=("log_loss", "mean")).reset_index()
+        g.insert(0, "level", level)
+        g.insert(2, "group", g.pop(by).astype(str) if by else "all")
+        parts.append(g)
+    return pd.concat(parts, ignore_index=True)
+
+
+def reliability(f, bins=10):
+    """Reliability curve per source: mean forecast vs observed YES rate in `bins` equal-width bins."""
+    p = f["p"].to_numpy(dtype="float64")
+    b = np.minimum((p * bins).astype(int), bins - 1)
+    return (f.assign(bin=b).groupby(["source", "bin"], observed=True)
+            .agg(n=("p", "size"), mean_forecast=("p", "mean"), observed_rate=("y", "mean"))
+            .reset_index())
+
+
+def calibration_charts(scored, curve):
+    """Reliability diagram and Brier-by-time-to-deadline figures."""
+    import matplotlib.pyplot as plt
+    figs = []
+    fig = plt.figure(figsize=(7,7))
+    plt.plot([0,1], [0,1], color="grey", linestyle="--", linewidth=1, label="Perfectly calibrated")
+    for source, group in curve.groupby("source", observed=True):
+        line, = plt.plot(group["mean_forecast"], group["observed_rate"], marker="o", label=source.title())
+        # marker area shows how many forecasts fall in each bin
+        plt.scatter(group["mean_forecast"], group["observed_rate"], s=20 + 200 * group["n"] / group["n"].max(),
+                    color=line.get_color(), alpha=0.3)
+    plt.title("Odds Calibration – Forecast vs Observed YES Rate")
+    plt.xlabel("Forecast P(YES)")
+    plt.ylabel("Observed YES rate")
+    plt.xlim(0,1); plt.ylim(0,1)
+    plt.legend()
+    figs.append(fig)
+
+    by_deadline = scored[scored["level"] == "to_deadline"]
+    if not by_deadline.empty:
+        fig = plt.figure(figsize=(9,5))
+        wide = by_deadline.pivot(index="group", columns="source", values="brier")
+        wide = wide.reindex([l for l in DEADLINE_LABELS if l in wide.index])
+        x = np.arange(len(wide))
+        w = 0.8 / len(wide.columns)
+        for i, source in enumerate(wide.columns):
+            plt.bar(x + (i - (len(wide.columns) - 1) / 2) * w, wide[source], w, label=str(source).title())
+        plt.axhline(0.25, color="grey", linestyle="--", linewidth=1, label="Always 50%")
+        plt.xticks(x, wide.index)
+        plt.title("Brier Score by Time to Deadline (lower is better)")
+        plt.xlabel("Time before deadline")
+        plt.ylabel("Brier score")
+        plt.ylim(0, max(0.25, wide.max().max()) * 1.35)
+        plt.legend(loc="upper right")
+        figs.append(fig)
+    return figs
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Chart data payloads for StaticFruit clients that draw their own charts.
+
+Instead of images, every chart is written as the few series it plots:
+pools, pool-implied odds, leaderboard, bet-size histogram and the
+market x day volume heatmap. Series are pre-binned (histogram, daily
+volume) and long lines are downsampled with largest-triangle-three-buckets,
+which keeps the visible shape (spikes and swings) at a fixed point budget.
+The bet-size histogram uses log-spaced bins, marked `"scale": "log"` so
+clients draw it on a log axis (the PDF report's histogram is linear).
+
+Payloads are compact columnar JSON: `global.json` plus one
+`market_<id>.json` per market. With pyarrow installed, the tabular series
+can also be written as Arrow IPC files.
+"""
+import os
+import json
+import numpy as np
+import pandas as pd
+
+
+def lttb(x, y, max_points):
+    """Indices of the points largest-triangle-three-buckets keeps out of (x, y)."""
+    n = len(x)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    x = x - x[0]   # areas don't change; keeps the prefix sums of epoch ms small
+    y = np.asarray(y, dtype="float64")
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    # prefix sums give each next bucket's centroid without a mean() call per bucket
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    keep = np.empty(max_points, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx = (cum_x[nxt_hi] - cum_x[nxt_lo]) / (nxt_hi - nxt_lo)
+        cy = (cum_y[nxt_hi] - cum_y[nxt_lo]) / (nxt_hi - nxt_lo)
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def epoch_ms(ts):
+    return (pd.to_datetime(ts).astype("datetime64[ms]").astype("int64")).tolist()
+
+
+def rounded(values, digits):
+    return [None if v != v else v for v in np.round(np.asarray(values, dtype="float64"), digits).tolist()]
+
+
+def odds_series(history, max_points=500):
+    """Downsampled pool-implied P(YES) line for one market's per-bet history."""
+    p_yes = history["p_yes"].to_numpy(dtype="float64")
+    known = ~np.isnan(p_yes)
+    ms = history["ts"].to_numpy(dtype="datetime64[ms]").astype("int64")[known]
+    p_yes = p_yes[known]
+    keep = lttb(ms, p_yes, max_points)
+    return {"ts": ms[keep].tolist(), "p_yes": rounded(p_yes[keep], 4)}
+
+
+def histogram(amounts, bins=60):
+    """Bet-size histogram on log-spaced bins (stakes span orders of magnitude).
+
+    `scale` is "log": clients should draw the bins on a log x axis.
+    """
+    amounts = np.asarray(amounts, dtype="float64")
+    amounts = amounts[amounts > 0]
+    if len(amounts) == 0:
+        return {"scale": "log", "edges": [], "counts": []}
+    lo, hi = amounts.min(), amounts.max()
+    edges = np.geomspace(lo, hi if hi > lo else lo * 1.01, bins + 1)
+    counts, _ = np.histogram(amounts, bins=edges)
+    return {"scale": "log", "edges": rounded(edges, 4), "counts": counts.tolist()}
+
+
+def pools_series(pool_tot):
+    return {
+        "market_id": pool_tot["market_id"].tolist(),
+        "title": pool_tot["market_title"].astype(str).tolist(),
+        "pool_yes": rounded(pool_tot["pool_yes"], 2),
+        "pool_no": rounded(pool_tot["pool_no"], 2),
+    }
+
+
+def global_payload(data, rank_by="bet_amount", max_points=500):
+    """Payload for the overview charts, from staticfruit_graphs_live.compute()'s output."""
+    volume = data["volume_matrix"]
+    history = data["odds_history"]
+    return {
+        "pools": pools_series(data["pool_tot"]),
+        "odds": {str(mid): odds_series(group, max_points // 4)
+                 for mid, group in history.groupby("market_id", sort=True)},
+        "leaderboard": {"rank_by": rank_by, "user": data["leaderboard"]["user"].astype(str).tolist(),
+                        "value": rounded(data["leaderboard"][rank_by], 4)},
+        "histogram": histogram(data["bets"]["bet_amount"]),
+        "heatmap": {"market_id": volume.index.tolist(), "day": epoch_ms(pd.Series(volume.columns)),
+                    "bets": volume.to_numpy(dtype="int64").tolist()},
+    }
+
+
+def market_payload(market_id, title, pools, amounts, history, volume, max_points=500):
+    """Payload for one market's charts, from that market's rows of each series."""
+    volume = volume[volume > 0]
+    return {
+        "market_id": int(market_id),
+        "title": str(title),
+        "pools": pools_series(pools),
+        "odds": odds_series(history, max_points),
+        "histogram": histogram(amounts),
+        "daily_bets": {"day": epoch_ms(pd.Series(volume.index)), "bets": volume.astype("int64").tolist()},
+    }
+
+
+def market_payloads(data, max_points=500):
+    """(market_id, payload) for every market, grouping bets and odds history once (not a scan per market)."""
+    bet_rows = data["bets"].groupby("market_id", sort=False).indices
+    history_rows = data["odds_history"].groupby("market_id", sort=False).indices
+    amounts = data["bets"]["bet_amount"].to_numpy()
+    history = data["odds_history"]
+    volume = data["volume_matrix"]
+    pool_tot = data["pool_tot"].reset_index(drop=True)
+    none = np.empty(0, dtype=int)
+    for i, market_id in enumerate(pool_tot["market_id"].tolist()):
+        yield market_id, market_payload(
+            market_id,
+            data["titles"].get(market_id, market_id),
+            pool_tot.iloc[[i]],
+            amounts[bet_rows.get(market_id, none)],
+            history.iloc[history_rows.get(market_id, none)],
+            volume.loc[market_id] if market_id in volume.index else pd.Series(dtype="int64"),
+            max_points,
+        )
+
+
+def write_json(payload, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    return path
+
+
+def write_arrow_table(columns, path):
+    """Write equal-length columns ({name: list}) as an Arrow IPC file."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise SystemExit("Arrow output needs pyarrow: pip install pyarrow")
+    table = pa.table(columns)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return path
+
+
+def write_arrow(payload, path_stem):
+    """Write each flat, equal-length series in `payload` as `<stem>.<name>.arrow`."""
+    paths = []
+    for name, series in payload.items():
+        if not isinstance(series, dict):
+            continue
+        columns = {k: v for k, v in series.items() if isinstance(v, list) and (not v or not isinstance(v[0], list))}
+        if not columns or len({len(v) for v in columns.values()}) != 1:
+            continue
+        paths.append(write_arrow_table(columns, f"{path_stem}.{name}.arrow"))
+    return paths
+
+
+def write_payloads(data, outdir, rank_by="bet_amount", max_points=500, arrow=False):
+    """Write global.json and market_<id>.json (plus Arrow files if asked); returns the paths."""
+    os.makedirs(outdir, exist_ok=True)
+    payloads = {"global": global_payload(data, rank_by, max_points)}
+    for market_id, payload in market_payloads(data, max_points):
+        payloads[f"market_{market_id}"] = payload
+    paths = []
+    for stem, payload in payloads.items():
+        paths.append(write_json(payload, os.path.join(outdir, stem + ".json")))
+        if arrow:
+            paths += write_arrow(payload, os.path.join(outdir, stem))
+    return paths
@@ -1,19 +1,40 @@
 #!/usr/bin/env python3
 """
 Simple graph generator for StaticFruit
+
+Usage:
+  python generate_graph.py --type pools --data pools.csv --output pools.png
+  # many graphs in one process: shared CSVs are read once, rendering can run in parallel
+  python generate_graph.py --manifest batch.json --workers 4
+
+Batch manifest (JSON, or - to read it from stdin):
+  {"jobs": [
+    {"type": "pools", "data": "all_pools.csv", "market_id": 3, "output": "out/pools_3.png"},
+    {"type": "odds", "data": [{"market_id": 3, "odds_yes": 0.6, "odds_no": 0.4}], "output": "out/odds_3.png"},
+    {"type": "leaderboard", "data": "leaderboard.csv", "output": "out/leaderboard.json", "format": "json"}
+  ]}
+"data" is a CSV path or inline rows; "market_id" keeps only that market's rows.
 """
 import sys
+import json
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import os
 
+def read_data(data):
+    """CSV path or an already loaded DataFrame"""
+    if isinstance(data, pd.DataFrame):
+        return data
+    return pd.read_csv(data)
+
 def generate_pools_graph(data_file, output_file):
     """Generate pools graph from CSV data"""
     try:
         # Read data
-        data = pd.read_csv(data_file)
+        data = read_data(data_file)
         
         # Create graph
         fig = plt.figure(figsize=(10, 6))
@@ -53,7 +74,7 @@ def generate_odds_graph(data_file, output_file):
     """Generate odds graph from CSV data"""
     try:
         # Read data
-        data = pd.read_csv(data_file)
+        data = read_data(data_file)
         
         # Create graph
         fig = plt.figure(figsize=(10, 6))
@@ -91,7 +112,7 @@ def generate_leaderboard_graph(data_file, output_file):
     """Generate leaderboard graph from CSV data"""
     try:
         # Read data
-        data = pd.read_csv(data_file)
+        data = read_data(data_file)
         
         # Create graph
         fig = plt.figure(figsize=(12, 8))
@@ -126,36 +147,122 @@ def generate_leaderboard_graph(data_file, output_file):
         print(f"Error generating leaderboard graph: {e}", file=sys.stderr)
         return False
 
+def chart_labels(data):
+    if 'market_title' in data.columns:
+        return data['market_title'].astype(str).tolist()
+    return [f'Market {mid}' for mid in data['market_id']]
+
+# Columns each graph type plots, for data output
+DATA_COLUMNS = {
+    'pools': ['market_id', 'pool_yes', 'pool_no'],
+    'odds': ['market_id', 'odds_yes', 'odds_no'],
+    'leaderboard': ['address', 'total_staked'],
+}
+
+def generate_chart_data(graph_type, data_file, output_file, fmt='json'):
+    """Write the series a graph type plots (JSON or Arrow IPC) instead of rendering it"""
+    import chart_data
+    try:
+        data = read_data(data_file)
+        columns = [c for c in DATA_COLUMNS[graph_type] if c in data.columns]
+        series = {c: data[c].tolist() for c in columns}
+        if graph_type != 'leaderboard':
+            series = {'label': chart_labels(data), **series}
+
+        if fmt == 'arrow':
+            chart_data.write_arrow_table(series, output_file)
+        else:
+            chart_data.write_json({graph_type: series}, output_file)
+        return True
+    except Exception as e:
+        print(f"Error generating {graph_type} data: {e}", file=sys.stderr)
+        return False
+
+GRAPH_TYPES = {
+    'pools': generate_pools_graph,
+    'odds': generate_odds_graph,
+    'leaderboard': generate_leaderboard_graph,
+}
+FORMATS = ['png', 'json', 'arrow']
+
+def generate(graph_type, data, output_file, fmt='png'):
+    """Render one graph (or write its data) to output_file; returns success"""
+    # Create output directory if it doesn't exist
+    output_dir = os.path.dirname(output_file)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+
+    if fmt != 'png':
+        success = generate_chart_data(graph_type, data, output_file, fmt)
+    else:
+        success = GRAPH_TYPES[graph_type](data, output_file)
+
+    if success:
+        print(f"{'Graph' if fmt == 'png' else 'Data'} saved to {output_file}")
+    else:
+        print(f"Failed to generate {graph_type} graph", file=sys.stderr)
+    return success
+
+def batch_jobs(manifest):
+    """(type, data, output, format) for each manifest job; each CSV is read once"""
+    loaded = {}
+    jobs = []
+    for i, job in enumerate(manifest.get('jobs', [])):
+        graph_type, data, output = job.get('type'), job.get('data'), job.get('output')
+        if graph_type not in GRAPH_TYPES or data is None or not output:
+            raise SystemExit(f"Manifest job {i} needs type ({', '.join(GRAPH_TYPES)}), data and output")
+        fmt = job.get('format', 'png')
+        if fmt not in FORMATS:
+            raise SystemExit(f"Manifest job {i} has format {fmt!r}; use one of {', '.join(FORMATS)}")
+        if isinstance(data, list):
+            frame = pd.DataFrame(data)
+        else:
+            if data not in loaded:
+                loaded[data] = pd.read_csv(data)
+            frame = loaded[data]
+        if job.get('market_id') is not None:
+            frame = frame[frame['market_id'] == job['market_id']].reset_index(drop=True)
+        jobs.append((graph_type, frame, output, fmt))
+    return jobs
+
+def run_batch(manifest, workers=1):
+    """Generate every manifest job in this process (or a pool of workers); returns failure count"""
+    jobs = batch_jobs(manifest)
+    workers = workers or manifest.get('workers') or 1
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = list(pool.map(generate, *zip(*jobs)))
+    else:
+        results = [generate(*job) for job in jobs]
+    return results.count(False)
+
 def main():
     parser = argparse.ArgumentParser(description='Generate StaticFruit graphs')
-    parser.add_argument('--type', required=True, choices=['pools', 'odds', 'leaderboard'], 
+    parser.add_argument('--type', choices=list(GRAPH_TYPES),
                        help='Type of graph to generate')
-    parser.add_argument('--data', required=True, help='Path to CSV data file')
-    parser.add_argument('--output', required=True, help='Output PNG file path')
+    parser.add_argument('--data', help='Path to CSV data file')
+    parser.add_argument('--output', help='Output PNG file path')
+    parser.add_argument('--format', choices=FORMATS, default='png',
+                       help='png renders the graph; json/arrow write its data series for client-side drawing')
+    parser.add_argument('--manifest', help='Batch manifest (JSON path, or - for stdin) instead of --type/--data/--output')
+    parser.add_argument('--workers', type=int, help='Parallel processes for batch mode')
     
     args = parser.parse_args()
+
+    if args.manifest:
+        if args.manifest == '-':
+            manifest = json.load(sys.stdin)
+        else:
+            with open(args.manifest) as f:
+                manifest = json.load(f)
+        failed = run_batch(manifest, args.workers)
+        sys.exit(1 if failed else 0)
+
+    if not (args.type and args.data and args.output):
+        parser.error('--type, --data and --output are required (or use --manifest)')
     
-    # Create output directory if it doesn't exist
-    output_dir = os.path.dirname(args.output)
-    if output_dir and not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    
-    if args.type == 'pools':
-        success = generate_pools_graph(args.data, args.output)
-    elif args.type == 'odds':
-        success = generate_odds_graph(args.data, args.output)
-    elif args.type == 'leaderboard':
-        success = generate_leaderboard_graph(args.data, args.output)
-    else:
-        print(f"Unknown graph type: {args.type}", file=sys.stderr)
-        sys.exit(1)
-    
-    if success:
-        print(f"Graph saved to {args.output}")
-        sys.exit(0)
-    else:
-        print(f"Failed to generate {args.type} graph", file=sys.stderr)
-        sys.exit(1)
+    success = generate(args.type, args.data, args.output, args.format)
+    sys.exit(0 if success else 1)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -8,10 +8,13 @@ Environment variables:
   SUPABASE_URL=https://hhogymibdgsuwdlpfebs.supabase.co
   SUPABASE_SERVICE_ROLE_KEY=your_service_role_key
   SUPABASE_STORAGE_BUCKET=staticfruit-graphs
+  SUPABASE_STORAGE_KEEP_VERSIONS=10      # upload runs to keep (0 = no limit)
+  SUPABASE_STORAGE_RETENTION_DAYS=30     # delete runs older than this (0 = no limit)
 """
 
 import os
 import sys
+import json
 import datetime as dt
 from io import BytesIO
 import pandas as pd
@@ -19,11 +22,15 @@ import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_pdf import PdfPages
 from supabase import create_client, Client
+import renditions
+import retention
 
 # Supabase configuration
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
 STORAGE_BUCKET = os.environ.get("SUPABASE_STORAGE_BUCKET", "staticfruit-graphs")
+KEEP_VERSIONS = int(os.environ.get("SUPABASE_STORAGE_KEEP_VERSIONS", "10"))
+RETENTION_DAYS = float(os.environ.get("SUPABASE_STORAGE_RETENTION_DAYS", "30"))
 
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise SystemExit("Set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY environment variables")
@@ -128,35 +135,99 @@ def generate_pool_distribution_chart(market_pools_df):
 
     return fig
 
-def upload_to_supabase_storage(filename, fig):
-    """Upload matplotlib figure to Supabase Storage"""
+def upload_bytes_to_supabase_storage(storage_filename, data, content_type, cache_control=None):
+    """Upload raw bytes to Supabase Storage under `storage_filename`"""
+    options = {"content-type": content_type, "upsert": "true"}
+    if cache_control:
+        options["cache-control"] = cache_control
     try:
-        # Save figure to BytesIO buffer
-        buf = BytesIO()
-        fig.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-        buf.seek(0)
-
-        # Upload to Supabase Storage
-        timestamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
-        storage_filename = f"{timestamp}_{filename}"
-
         response = supabase.storage.from_(STORAGE_BUCKET).upload(
             storage_filename,
-            buf.getvalue(),
-            {"content-type": "image/png", "upsert": "true"}
+            data,
+            options
         )
 
         if response.status_code == 200:
-            print(f"✅ Uploaded {filename} to Supabase Storage")
+            print(f"✅ Uploaded {storage_filename} to Supabase Storage")
             return storage_filename
         else:
-            print(f"❌ Failed to upload {filename}: {response}")
+            print(f"❌ Failed to upload {storage_filename}: {response}")
             return None
 
     except Exception as e:
-        print(f"❌ Error uploading {filename}: {e}")
+        print(f"❌ Error uploading {storage_filename}: {e}")
+        return None
+
+def upload_to_supabase_storage(filename, fig, timestamp=None, manifest=None, previous=None):
+    """Render a matplotlib figure once and upload thumb/1x/2x PNG + WebP variants.
+
+    Returns the storage name of the standard PNG; variant details are added
+    to `manifest` (if given) under the chart name. Variants whose bytes match
+    an entry in `previous` (the chart's last latest.json variants) keep the
+    existing object instead of being uploaded again.
+    """
+    timestamp = timestamp or dt.datetime.now().strftime(retention.VERSION_FORMAT)
+    stem = os.path.splitext(filename)[0]
+    entries = []
+    try:
+        for name, suffix, fmt, w, h, data in renditions.variants(fig, dpi=150, bbox_inches='tight'):
+            entry = {"variant": name, "format": fmt, "width": w, "height": h,
+                     "bytes": len(data), "sha256": retention.content_hash(data)}
+            storage_filename = retention.reuse_unchanged(previous, entry)
+            if storage_filename is None:
+                storage_filename = upload_bytes_to_supabase_storage(f"{timestamp}_{stem}{suffix}.{fmt}",
+                                                                    data, renditions.FORMATS[fmt])
+            if storage_filename:
+                entries.append({"path": storage_filename, **entry})
+    except Exception as e:
+        print(f"❌ Error rendering {filename}: {e}")
         return None
 
+    if manifest is not None:
+        manifest[stem] = entries
+    standard = [e["path"] for e in entries if e["variant"] == "1x" and e["format"] == "png"]
+    return standard[0] if standard else None
+
+def download_latest_manifest():
+    """Current latest.json from the bucket ({} if there is none yet)"""
+    try:
+        data = supabase.storage.from_(STORAGE_BUCKET).download(retention.LATEST_MANIFEST)
+        return json.loads(data)
+    except Exception:
+        return {}
+
+def list_storage_objects():
+    """Names of all objects at the bucket root"""
+    names, offset = [], 0
+    while True:
+        page = supabase.storage.from_(STORAGE_BUCKET).list("", {"limit": 1000, "offset": offset})
+        names.extend(obj["name"] for obj in page)
+        if len(page) < 1000:
+            return names
+        offset += len(page)
+
+def apply_retention(latest):
+    """Delete upload runs beyond KEEP_VERSIONS or older than RETENTION_DAYS"""
+    try:
+        names = list_storage_objects()
+    except Exception as e:
+        print(f"⚠️  Skipping retention, could not list bucket: {e}")
+        return []
+
+    doomed = retention.expired(names, KEEP_VERSIONS, RETENTION_DAYS,
+                               protected=retention.referenced_keys(latest))
+    removed = []
+    for i in range(0, len(doomed), 100):
+        batch = doomed[i:i + 100]
+        try:
+            supabase.storage.from_(STORAGE_BUCKET).remove(batch)
+            removed.extend(batch)
+        except Exception as e:
+            print(f"❌ Error deleting old graphs: {e}")
+    if removed:
+        print(f"🧹 Deleted {len(removed)} old objects")
+    return removed
+
 def generate_and_upload_graphs():
     """Main function to generate and upload all graphs"""
     print("🚀 Starting StaticFruit graph generation...")
@@ -169,12 +240,17 @@ def generate_and_upload_graphs():
         return
 
     uploaded_files = []
+    timestamp = dt.datetime.now().strftime(retention.VERSION_FORMAT)
+    manifest = {}
+    previous = download_latest_manifest()
+    previous_variants = {name: chart.get("variants") for name, chart in previous.get("charts", {}).items()}
 
     # Generate and upload market pools chart
     print("📊 Generating market pools chart...")
     pools_fig = generate_market_pools_chart(market_pools)
     if pools_fig:
-        filename = upload_to_supabase_storage("market_pools.png", pools_fig)
+        filename = upload_to_supabase_storage("market_pools.png", pools_fig, timestamp, manifest,
+                                              previous_variants.get("market_pools"))
         if filename:
             uploaded_files.append(filename)
         plt.close(pools_fig)
@@ -184,7 +260,8 @@ def generate_and_upload_graphs():
         print("🏆 Generating leaderboard chart...")
         leaderboard_fig = generate_leaderboard_chart(leaderboard)
         if leaderboard_fig:
-            filename = upload_to_supabase_storage("leaderboard.png", leaderboard_fig)
+            filename = upload_to_supabase_storage("leaderboard.png", leaderboard_fig, timestamp, manifest,
+                                                  previous_variants.get("leaderboard"))
             if filename:
                 uploaded_files.append(filename)
             plt.close(leaderboard_fig)
@@ -193,7 +270,8 @@ def generate_and_upload_graphs():
     print("🥧 Generating pool distribution chart...")
     distribution_fig = generate_pool_distribution_chart(market_pools)
     if distribution_fig:
-        filename = upload_to_supabase_storage("pool_distribution.png", distribution_fig)
+        filename = upload_to_supabase_storage("pool_distribution.png", distribution_fig, timestamp, manifest,
+                                              previous_variants.get("pool_distribution"))
         if filename:
             uploaded_files.append(filename)
         plt.close(distribution_fig)
@@ -216,10 +294,27 @@ def generate_and_upload_graphs():
             plt.close(distribution_fig)
 
     # Upload PDF
-    pdf_filename = upload_to_supabase_storage("staticfruit_report.pdf", plt.figure())
+    pdf_filename = upload_bytes_to_supabase_storage(f"{timestamp}_staticfruit_report.pdf",
+                                                    pdf_buffer.getvalue(), "application/pdf")
     if pdf_filename:
         uploaded_files.append(pdf_filename)
 
+    # Upload the variant manifest so clients can pick a size/format
+    generated_at = dt.datetime.now(dt.timezone.utc).isoformat()
+    manifest_doc = {"generated_at": generated_at, "charts": manifest}
+    manifest_filename = upload_bytes_to_supabase_storage(f"{timestamp}_manifest.json",
+                                                         json.dumps(manifest_doc).encode(), "application/json")
+    if manifest_filename:
+        uploaded_files.append(manifest_filename)
+
+    # Point latest.json at this run; short cache so clients see updates quickly
+    latest = retention.update_latest(previous, manifest, generated_at,
+                                     report=pdf_filename, manifest=manifest_filename)
+    if upload_bytes_to_supabase_storage(retention.LATEST_MANIFEST, json.dumps(latest).encode(),
+                                        "application/json", cache_control="60"):
+        uploaded_files.append(retention.LATEST_MANIFEST)
+        apply_retention(latest)
+
     print(f"✅ Graph generation complete! Uploaded {len(uploaded_files)} files:")
     for filename in uploaded_files:
         print(f"   📁 {filename}")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+On-disk conditional-request cache for the StaticFruit REST loader.
+
+Each response is stored once per (url, params) as its validators (ETag /
+Last-Modified) plus the already-parsed DataFrame. The next request sends
+If-None-Match / If-Modified-Since; on 304 Not Modified the cached frame is
+used as-is, so an unchanged endpoint costs one small round trip and no
+download or JSON parse. Responses without validators are never cached.
+
+Layout:
+  <dir>/<key>.json  url, params, etag, last_modified, fetched_at
+  <dir>/<key>.pkl   parsed frame (local cache only, never shared)
+"""
+import os
+import json
+import hashlib
+import datetime as dt
+import pandas as pd
+
+
+def accept_encoding():
+    """gzip/deflate, plus br (pip install brotli) and zstd when urllib3 can decode them."""
+    from urllib3.util import make_headers
+    return make_headers(accept_encoding=True)["accept-encoding"]
+
+
+def cache_key(url, params):
+    raw = json.dumps([url, sorted((params or {}).items())], default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def _replace(path, write):
+    # Write next to the target and rename, so readers never see a partial file
+    tmp = path + ".tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _write_json(obj, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, default=str)
+
+
+def get_frame(session, url, params=None, cache_dir=None, timeout=60):
+    """GET a JSON array endpoint as a DataFrame, revalidating against `cache_dir` if given."""
+    headers = {"Accept-Encoding": accept_encoding()}
+    meta, meta_path, frame_path = None, None, None
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        key = cache_key(url, params)
+        meta_path = os.path.join(cache_dir, key + ".json")
+        frame_path = os.path.join(cache_dir, key + ".pkl")
+        if os.path.exists(meta_path) and os.path.exists(frame_path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+    resp = session.get(url, params=params, headers=headers, timeout=timeout)
+    if resp.status_code == 304 and meta is not None:
+        print(f"Not modified, using cached {url}")
+        return pd.read_pickle(frame_path)
+    resp.raise_for_status()
+    frame = pd.DataFrame(resp.json())
+
+    etag = resp.headers.get("ETag")
+    last_modified = resp.headers.get("Last-Modified")
+    if cache_dir and (etag or last_modified):
+        _replace(frame_path, frame.to_pickle)
+        meta = {"url": url, "params": params, "etag": etag, "last_modified": last_modified,
+                "fetched_at": dt.datetime.now(dt.timezone.utc).isoformat()}
+        _replace(meta_path, lambda p: _write_json(meta, p))
+    return frame
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Pool-implied odds for StaticFruit markets.
+
+After every bet, P(YES) = YES pool / total pool for that market. The running
+pools are per-market cumulative sums over time-ordered bets, so the whole
+history is computed in one vectorized pass; `sample_asof` then reads the
+value in force at the end of each interval (1h, 6h, 1D, ...).
+
+When only bets from some time on are loaded, `opening_pools` (the stake
+placed before then) seeds the running pools, so the odds match the ones
+computed from the full history.
+"""
+import pandas as pd
+
+
+OPENING_COLUMNS = ["open_pool_yes", "open_pool_no"]
+
+
+def opening_pools(bets, since):
+    """Per-market YES/NO stake placed before `since` (market_id, open_pool_yes, open_pool_no)."""
+    before = bets[bets["ts"] < since]
+    stake = before["bet_amount"].astype("float64")
+    yes = stake.where(before["outcome"] == 1, 0.0)
+    pools = pd.DataFrame({"open_pool_yes": yes, "open_pool_no": stake - yes})
+    return pools.groupby(before["market_id"]).sum().reset_index()
+
+
+def implied_odds(bets, opening=None):
+    """Per-bet running pools and pool-implied P(YES), in time order.
+
+    `opening` (market_id + OPENING_COLUMNS, e.g. the markets frame after a
+    --since filter) seeds each market's pools with the stake placed earlier.
+    """
+    if not bets["ts"].is_monotonic_increasing:
+        bets = bets.sort_values("ts", kind="stable")
+    stake = bets["bet_amount"].astype("float64")
+    yes = stake.where(bets["outcome"] == 1, 0.0)
+    by_market = bets["market_id"]
+    pool_yes = yes.groupby(by_market).cumsum()
+    pool_total = stake.groupby(by_market).cumsum()
+    if opening is not None and "open_pool_yes" in opening.columns:
+        o = opening.set_index("market_id")
+        open_yes = by_market.map(o["open_pool_yes"]).fillna(0.0)
+        pool_yes = pool_yes + open_yes
+        pool_total = pool_total + open_yes + by_market.map(o["open_pool_no"]).fillna(0.0)
+    return pd.DataFrame({
+        "ts": bets["ts"],
+        "market_id": by_market,
+        "pool_yes": pool_yes,
+        "pool_no": pool_total - pool_yes,
+        "p_yes": pool_yes / pool_total.where(pool_total > 0),
+    }).reset_index(drop=True)
+
+
+def sample_asof(odds, freq="1D"):
+    """P(YES) as of the end of each `freq` bucket, carried forward through quiet buckets.
+
+    Returns long form (market_id, ts, p_yes) where ts is the bucket start;
+    buckets before a market's first bet are omitted.
+    """
+    if odds.empty:
+        return pd.DataFrame(columns=["market_id", "ts", "p_yes"])
+    bucket = odds["ts"].dt.floor(freq)
+    last = odds.groupby(["market_id", bucket])["p_yes"].last()
+    wide = last.unstack("ts")
+    buckets = pd.date_range(bucket.min(), bucket.max(), freq=freq)
+    wide = wide.reindex(columns=buckets).ffill(axis=1)
+    wide.columns.name = "ts"
+    out = wide.reset_index().melt(id_vars="market_id", var_name="ts", value_name="p_yes")
+    out = out.dropna(subset=["p_yes"])
+    return out.sort_values(["market_id", "ts"], kind="stable").reset_index(drop=True)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Priority render scheduler for per-market StaticFruit charts.
+
+Markets are queued for re-rendering when they change; each market is in the
+queue at most once (repeated updates coalesce into the pending job). Jobs are
+taken highest priority first, at no more than `rate` renders per second:
+
+  deadline   1 at the deadline, falling to 0 `deadline_horizon` seconds before it
+  volume     recent stake (decayed with `halflife`) relative to the busiest queued market
+  requests   recent chart requests (decayed the same way), relative to the most requested
+  waiting    seconds queued / `max_wait`, so quiet markets are never starved
+
+When the queue is full, the lowest-priority job is dropped; that market is
+queued again on its next update.
+
+Usage:
+  # follow the bet log (see bet_log.py), re-rendering changed markets into sf_live/
+  python render_scheduler.py watch --log sf_log --markets markets.csv --outdir sf_live
+  # optional chart-request feed, JSON lines with a market_id (e.g. from the API)
+  python render_scheduler.py watch --log sf_log --requests sf_requests.jsonl
+"""
+import os
+import sys
+import time
+import json
+import math
+import argparse
+import pandas as pd
+
+
+class RenderScheduler:
+    def __init__(self, render, max_queue=256, rate=2.0, deadline_horizon=86400, halflife=600,
+                 max_wait=300, weights=None):
+        self.render = render
+        self.max_queue = max_queue
+        self.rate = rate
+        self.deadline_horizon = deadline_horizon
+        self.decay = math.log(2) / halflife
+        self.max_wait = max_wait
+        self.weights = {"deadline": 1.0, "volume": 1.0, "requests": 1.0, **(weights or {})}
+        self.deadlines = {}     # market_id -> deadline (s since epoch)
+        self.volume = {}        # market_id -> [decayed stake, as of (s)]
+        self.requests = {}      # market_id -> [decayed request count, as of (s)]
+        self.pending = {}       # market_id -> time first queued (s)
+        self.tokens = 1.0
+        self.last_refill = None
+        self.dropped = 0
+
+    def _bump(self, table, market_id, amount, now):
+        v = table.get(market_id)
+        if v is None:
+            table[market_id] = [amount, now]
+        else:
+            v[0] = v[0] * math.exp(-self.decay * max(now - v[1], 0)) + amount
+            v[1] = now
+
+    def _level(self, table, market_id, now):
+        v = table.get(market_id)
+        return v[0] * math.exp(-self.decay * max(now - v[1], 0)) if v else 0.0
+
+    def set_deadlines(self, deadlines):
+        self.deadlines.update(deadlines)
+
+    def note_bet(self, market_id, amount, now):
+        self._bump(self.volume, market_id, amount, now)
+
+    def note_request(self, market_id, now, n=1):
+        self._bump(self.requests, market_id, n, now)
+
+    def priorities(self, now):
+        """Current priority of every queued market."""
+        volume = {m: self._level(self.volume, m, now) for m in self.pending}
+        requests = {m: self._level(self.requests, m, now) for m in self.pending}
+        top_volume = max(volume.values(), default=0) or 1.0
+        top_requests = max(requests.values(), default=0) or 1.0
+        w = self.weights
+        out = {}
+        for m, queued_at in self.pending.items():
+            deadline = self.deadlines.get(m)
+            urgency = 0.0
+            if deadline is not None and deadline >= now:
+                urgency = max(0.0, 1 - (deadline - now) / self.deadline_horizon)
+            out[m] = (w["deadline"] * urgency + w["volume"] * volume[m] / top_volume
+                      + w["requests"] * requests[m] / top_requests + (now - queued_at) / self.max_wait)
+        return out
+
+    def submit(self, market_id, now):
+        """Queue `market_id` for a render; a market already queued keeps its place."""
+        if market_id in self.pending:
+            return True
+        self.pending[market_id] = now
+        if len(self.pending) > self.max_queue:
+            ranked = self.priorities(now)
+            lowest = min(ranked, key=ranked.get)
+            del self.pending[lowest]
+            self.dropped += 1
+            return lowest != market_id
+        return True
+
+    def run_pending(self, now):
+        """Render queued markets, best first, as far as the rate limit allows; returns those rendered."""
+        if self.last_refill is not None:
+            self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+        done = []
+        while self.pending and self.tokens >= 1:
+            ranked = self.priorities(now)
+            market_id = max(ranked, key=ranked.get)
+            del self.pending[market_id]
+            self.tokens -= 1
+            self.render(market_id)
+            done.append(market_id)
+        return done
+
+
+def market_chart(bets, title):
+    """Pools and pool-implied P(YES) over time for one market."""
+    import matplotlib.pyplot as plt
+    import odds
+    history = odds.implied_odds(bets)
+    fig, (ax_pool, ax_odds) = plt.subplots(1, 2, figsize=(12, 5), gridspec_kw={"width_ratios": [1, 2]})
+    last = history.iloc[-1]
+    ax_pool.bar(["NO", "YES"], [last["pool_no"], last["pool_yes"]], color=["#ff6b6b", "#4ecdc4"])
+    ax_pool.set_ylabel("Total FRUIT Staked")
+    ax_odds.plot(history["ts"], history["p_yes"], drawstyle="steps-post")
+    ax_odds.set_ylabel("P(YES)")
+    ax_odds.set_ylim(0, 1)
+    ax_odds.tick_params(axis="x", labelrotation=45)
+    fig.suptitle(str(title)[:80])
+    return fig
+
+
+def watch(log_dir, outdir, markets=None, requests_feed=None, poll=1.0, from_start=False, **scheduler_args):
+    """Tail the bet log and keep one chart per changed market fresh in `outdir`, busiest/closest first."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import bet_log
+    import renditions
+
+    os.makedirs(outdir, exist_ok=True)
+    titles = {}
+    deadlines = {}
+    if markets:
+        m = pd.read_csv(markets)
+        if "title" in m.columns:
+            titles = dict(zip(m["market_id"], m["title"]))
+        if "deadline" in m.columns:
+            ts = pd.to_datetime(m["deadline"], utc=True, format="ISO8601")
+            deadlines = {mid: t.timestamp() for mid, t in zip(m["market_id"], ts) if pd.notna(t)}
+
+    def render(market_id):
+        bets = bet_log.read(log_dir, market_ids=[market_id])
+        if bets.empty:
+            return
+        fig = market_chart(bets, titles.get(market_id, f"Market {market_id}"))
+        renditions.write_variants(fig, outdir, f"sf_market_{market_id}", dpi=120, bbox_inches="tight")
+        plt.close(fig)
+        print(f"rendered market {market_id}", flush=True)
+
+    scheduler = RenderScheduler(render, **scheduler_args)
+    scheduler.set_deadlines(deadlines)
+    pos = 0 if from_start else len(bet_log.open_log(log_dir))
+    req_pos = 0 if (from_start or not requests_feed or not os.path.exists(requests_feed)) \
+        else os.path.getsize(requests_feed)
+    while True:
+        now = time.time()
+        rec = bet_log.open_log(log_dir)
+        if len(rec) > pos:
+            new = rec[pos:]
+            for market_id, amount in zip(new["market_id"].tolist(), new["bet_amount"].tolist()):
+                scheduler.note_bet(market_id, amount, now)
+                scheduler.submit(market_id, now)
+            pos = len(rec)
+        del rec
+        if requests_feed and os.path.exists(requests_feed):
+            with open(requests_feed, encoding="utf-8") as f:
+                f.seek(req_pos)
+                for line in f:
+                    if not line.endswith("\n"):
+                        break
+                    req_pos += len(line.encode("utf-8"))
+                    if line.strip():
+                        scheduler.note_request(int(json.loads(line)["market_id"]), now)
+        scheduler.run_pending(time.time())
+        time.sleep(poll)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="StaticFruit priority render scheduler")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ap_watch = sub.add_parser("watch", help="Re-render changed markets from an append-only bet log")
+    ap_watch.add_argument("--log", required=True, help="Bet log directory")
+    ap_watch.add_argument("--outdir", default="sf_live")
+    ap_watch.add_argument("--markets", help="Markets CSV (titles and deadlines)")
+    ap_watch.add_argument("--requests", help="JSON lines feed of chart requests ({\"market_id\": ...})")
+    ap_watch.add_argument("--poll", type=float, default=1.0, help="Seconds between log checks")
+    ap_watch.add_argument("--from-start", action="store_true", help="Queue every market in the log first")
+    ap_watch.add_argument("--rate", type=float, default=2.0, help="Max renders per second")
+    ap_watch.add_argument("--max-queue", type=int, default=256, help="Max queued markets")
+    ap_watch.add_argument("--deadline-horizon", type=float, default=86400, help="Seconds")
+    ap_watch.add_argument("--halflife", type=float, default=600, help="Seconds")
+    args = ap.parse_args()
+
+    try:
+        watch(args.log, args.outdir, markets=args.markets, requests_feed=args.requests, poll=args.poll,
+              from_start=args.from_start, rate=args.rate, max_queue=args.max_queue,
+              deadline_horizon=args.deadline_horizon, halflife=args.halflife)
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Multi-size, multi-format chart output for StaticFruit graphs.
+
+A figure is rendered once, at 2x its standard dpi, into a raster buffer.
+Every variant (thumbnail, standard, 2x) is resized from that buffer and
+encoded as a palette PNG and a WebP, so clients can fetch the smallest
+file that fits instead of the full-size PNG.
+"""
+import os
+from io import BytesIO
+from PIL import Image
+
+# name, file suffix, scale of the 2x render (or fixed width in px)
+VARIANTS = [
+    ("thumb", ".thumb", {"width": 400}),
+    ("1x", "", {"scale": 0.5}),
+    ("2x", "@2x", {"scale": 1.0}),
+]
+FORMATS = {"png": "image/png", "webp": "image/webp"}
+
+
+def render(fig, dpi=160, bbox_inches=None):
+    """Rasterize `fig` once at 2x `dpi`; returns an RGB PIL image."""
+    buf = BytesIO()
+    # compress_level=0: this PNG is only a transport to PIL, not an output
+    fig.savefig(buf, format="png", dpi=dpi * 2, bbox_inches=bbox_inches,
+                pil_kwargs={"compress_level": 0})
+    buf.seek(0)
+    return Image.open(buf).convert("RGB")
+
+
+def encode(img, fmt):
+    buf = BytesIO()
+    if fmt == "png":
+        # charts are flat colours, so a fast 256-colour palette loses nothing visible
+        img.quantize(colors=256, method=Image.Quantize.FASTOCTREE).save(buf, format="PNG", optimize=True)
+    else:
+        img.save(buf, format="WEBP", quality=80, method=2)
+    return buf.getvalue()
+
+
+def variants(fig, dpi=160, bbox_inches=None):
+    """Yield (variant, suffix, fmt, width, height, bytes) for every size/format."""
+    full = render(fig, dpi=dpi, bbox_inches=bbox_inches)
+    for name, suffix, size in VARIANTS:
+        if "width" in size:
+            w = min(size["width"], full.width)
+        else:
+            w = round(full.width * size["scale"])
+        h = round(full.height * w / full.width)
+        img = full if (w, h) == full.size else full.resize((w, h), Image.LANCZOS)
+        for fmt in FORMATS:
+            yield name, suffix, fmt, w, h, encode(img, fmt)
+
+
+def write_variants(fig, outdir, stem, dpi=160, bbox_inches=None):
+    """Write `<stem><suffix>.<fmt>` files; returns manifest entries for them."""
+    entries = []
+    for name, suffix, fmt, w, h, data in variants(fig, dpi=dpi, bbox_inches=bbox_inches):
+        filename = f"{stem}{suffix}.{fmt}"
+        with open(os.path.join(outdir, filename), "wb") as f:
+            f.write(data)
+        entries.append({"variant": name, "format": fmt, "path": filename,
+                        "width": w, "height": h, "bytes": len(data)})
+    return entries
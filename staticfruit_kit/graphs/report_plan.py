@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Run several StaticFruit reports from one plan, in one process.
+
+A plan lists reports; each report takes the same options as
+staticfruit_graphs_live.py (dashes or underscores, without the leading --):
+
+  {
+    "workers": 4,
+    "defaults": {"mode": "csv", "markets": "markets.csv", "bets": "bets.csv"},
+    "reports": [
+      {"name": "all",      "outdir": "out/all", "anomalies": true},
+      {"name": "market-1", "outdir": "out/m1",  "market_ids": [1], "odds_interval": "1h"},
+      {"name": "by-pnl",   "outdir": "out/pnl", "rank_by": "realized_pnl"}
+    ]
+  }
+
+Stages run as a small DAG:
+  load     once per data source (mode + paths), shared by every report on it
+  compute  once per distinct (source, filters, aggregation options); the
+           leaderboard ranking is per report, anomaly flags once per compute
+  render   tables, PDF and images per report, in parallel across `workers`
+
+Usage:
+  python report_plan.py plan.json
+  python report_plan.py plan.yaml --workers 8     # YAML needs: pip install pyyaml
+"""
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+matplotlib.use("Agg")
+import staticfruit_graphs_live as live
+
+# Options that pick the data source, the filters applied to it, and the
+# aggregation settings; everything else (including --rank-by and --anomalies,
+# applied per report by live.report_views) doesn't change the shared aggregates
+SOURCE_KEYS = ("mode", "markets", "bets", "log", "store")
+FILTER_KEYS = ("market_ids", "since", "until")
+COMPUTE_KEYS = ("workers", "odds_interval", "fee_bps")
+
+
+def read_plan(path):
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise SystemExit("YAML plans need PyYAML: pip install pyyaml (or use a JSON plan)")
+            plan = yaml.safe_load(f)
+        else:
+            plan = json.load(f)
+    if not plan or not plan.get("reports"):
+        raise SystemExit(f"{path}: plan has no reports")
+    return plan
+
+
+def report_argv(options):
+    """Turn a report's options into the live script's command line."""
+    argv = []
+    for key, value in options.items():
+        if key == "name" or value is None or value is False:
+            continue
+        flag = "--" + key.replace("_", "-")
+        if value is True:
+            argv.append(flag)
+        elif isinstance(value, (list, tuple)):
+            argv += [flag, ",".join(str(v) for v in value)]
+        else:
+            argv += [flag, str(value)]
+    return argv
+
+
+def report_args(plan):
+    """Parsed live-script args for every report, defaults applied."""
+    parser = live.build_parser()
+    reports = []
+    for i, report in enumerate(plan["reports"]):
+        options = {**plan.get("defaults", {}), **report}
+        options = {k.replace("-", "_"): v for k, v in options.items()}
+        name = options.get("name") or f"report-{i + 1}"
+        if "outdir" not in options:
+            raise SystemExit(f"report {name!r} needs an outdir")
+        try:
+            args = parser.parse_args(report_argv(options))
+        except SystemExit:
+            raise SystemExit(f"report {name!r} has invalid options")
+        reports.append((name, args))
+    return reports
+
+
+def key(args, names):
+    return tuple((n, repr(getattr(args, n))) for n in names)
+
+
+def unfiltered(args):
+    """Copy of `args` with the filters cleared."""
+    out = argparse.Namespace(**vars(args))
+    out.market_ids = out.since = out.until = None
+    return out
+
+
+def render_report(name, args, data):
+    return name, live.write_outputs(args, data)
+
+
+def run(plan, workers=None):
+    reports = report_args(plan)
+    workers = workers or plan.get("workers") or 1
+
+    # Load stage: one load per source. When every report on a source asks
+    # for the same filters they are pushed into the loader; otherwise the
+    # source is loaded once in full and filtered in memory per report.
+    sources = {}
+    for name, args in reports:
+        sources.setdefault(key(args, SOURCE_KEYS), []).append(args)
+    loaded = {}
+    for source, group in sources.items():
+        filters = {key(a, FILTER_KEYS) for a in group}
+        first = group[0]
+        if len(filters) == 1:
+            print(f"load {first.mode} (filtered, {len(group)} report(s))")
+            loaded[source] = (True, live.load(first))
+        else:
+            print(f"load {first.mode} (shared by {len(group)} reports)")
+            loaded[source] = (False, live.load(unfiltered(first)))
+
+    # Compute stage: memoized on source + filters + aggregation options;
+    # anomaly flags depend only on the bets, so they are memoized the same way
+    computed = {}
+    flags = {}
+    jobs = []
+    for name, args in reports:
+        source = key(args, SOURCE_KEYS)
+        ckey = (source, key(args, FILTER_KEYS), key(args, COMPUTE_KEYS))
+        if ckey not in computed:
+            pushed_down, (markets, bets) = loaded[source]
+            if not pushed_down:
+                markets, bets = live.apply_filters(markets, bets, args)
+            computed[ckey] = live.compute_shared(args, markets, bets)
+        else:
+            print(f"{name}: reusing aggregates")
+        data = live.report_views(args, computed[ckey], flags.get(ckey))
+        if args.anomalies:
+            flags[ckey] = data["anomaly_flags"]
+        jobs.append((name, args, data))
+
+    # Render stage: independent per report
+    done = {}
+    if workers <= 1 or len(jobs) == 1:
+        for job in jobs:
+            name, written = render_report(*job)
+            done[name] = written
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            for name, written in pool.map(render_report, *zip(*jobs)):
+                done[name] = written
+    for name, written in done.items():
+        print(f"{name}: wrote {written}")
+    return done
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run a StaticFruit report plan")
+    ap.add_argument("plan", help="JSON (or YAML) report plan")
+    ap.add_argument("--workers", type=int, help="Parallel render processes (overrides the plan)")
+    args = ap.parse_args()
+    run(read_plan(args.plan), workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
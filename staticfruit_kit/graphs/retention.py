@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Versioning helpers for graphs uploaded to Supabase Storage.
+
+Every upload run writes objects named `<YYYYmmdd_HHMMSS>_<file>`; that
+prefix is the run's version. `latest.json` maps each chart name to its
+current object keys and content hashes, so clients fetch one small file
+instead of listing the bucket, and retention can drop old versions without
+breaking what clients are pointed at.
+"""
+import hashlib
+import datetime as dt
+
+LATEST_MANIFEST = "latest.json"
+VERSION_FORMAT = "%Y%m%d_%H%M%S"
+VERSION_LENGTH = len("20250101_000000")
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def version_of(name):
+    """The upload run an object belongs to, or None for unversioned objects (e.g. latest.json)."""
+    try:
+        return dt.datetime.strptime(name[:VERSION_LENGTH], VERSION_FORMAT)
+    except ValueError:
+        return None
+
+
+def reuse_unchanged(previous, entry):
+    """Previous key for `entry` if its bytes are identical, so unchanged variants are not re-uploaded."""
+    for old in previous or []:
+        if (old.get("variant"), old.get("format"), old.get("sha256")) == \
+                (entry["variant"], entry["format"], entry["sha256"]):
+            return old["path"]
+    return None
+
+
+def referenced_keys(latest):
+    keys = set()
+    for chart in latest.get("charts", {}).values():
+        keys.update(v["path"] for v in chart.get("variants", []))
+    keys.update(v for k, v in latest.items() if k in ("report", "manifest") and v)
+    return keys
+
+
+def update_latest(previous, charts, generated_at, **extra):
+    """New latest.json content: this run's charts over the previous ones.
+
+    Charts not produced this run (e.g. no leaderboard data) keep their
+    previous entry rather than disappearing from the manifest.
+    """
+    latest = {"generated_at": generated_at, "charts": dict((previous or {}).get("charts", {}))}
+    for name, entries in charts.items():
+        if not entries:
+            continue
+        standard = [e for e in entries if e["variant"] == "1x" and e["format"] == "png"]
+        latest["charts"][name] = {
+            "key": standard[0]["path"] if standard else entries[0]["path"],
+            "sha256": standard[0]["sha256"] if standard else entries[0]["sha256"],
+            "variants": entries,
+        }
+    for k, v in extra.items():
+        latest[k] = v if v else (previous or {}).get(k)
+    return latest
+
+
+def expired(names, keep_versions=10, max_age_days=30, now=None, protected=()):
+    """Object names to delete: versions beyond the newest `keep_versions`, or older than `max_age_days`.
+
+    Either limit is off when 0/None. Unversioned objects and anything in
+    `protected` (keys latest.json points at) are never returned.
+    """
+    now = now or dt.datetime.now()
+    protected = set(protected)
+    versions = sorted({v for v in map(version_of, names) if v is not None}, reverse=True)
+    drop = set()
+    if keep_versions:
+        drop.update(versions[keep_versions:])
+    if max_age_days:
+        cutoff = now - dt.timedelta(days=max_age_days)
+        drop.update(v for v in versions if v < cutoff)
+    return [n for n in names if version_of(n) in drop and n not in protected]
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Parimutuel settlement for resolved StaticFruit markets.
+
+Markets resolve via an optional `resolved_outcome` column (0 = NO, 1 = YES,
+empty while open). For each resolved market the whole pool, minus a fee,
+is split across winning bets pro rata to stake. If nobody backed the winning
+side, every bet is refunded and no fee is taken.
+
+Everything is computed with array ops over market codes (no per-bet or
+per-market Python loop), so millions of bets settle in one pass.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+
+def settle(bets, markets, fee_bps=0):
+    """Return (per_bet, per_user, per_market) settlement frames for resolved markets.
+
+    per_bet keeps the index of `bets`, so it can be joined back onto the bets frame.
+    """
+    fee_rate = fee_bps / 10_000
+    if "resolved_outcome" not in markets.columns:
+        resolution = pd.Series(dtype="float64")
+    else:
+        resolution = markets.set_index("market_id")["resolved_outcome"].dropna()
+
+    b = bets.loc[bets["market_id"].isin(resolution.index),
+                 ["ts", "market_id", "user", "bet_amount", "outcome"]]
+    codes, market_ids = pd.factorize(b["market_id"])
+    stake = b["bet_amount"].to_numpy(dtype="float64")
+    n_markets = len(market_ids)
+
+    resolved = resolution.reindex(market_ids).to_numpy().astype("int8")
+    won = b["outcome"].to_numpy() == resolved[codes]
+
+    pool_total = np.bincount(codes, weights=stake, minlength=n_markets)
+    pool_win = np.bincount(codes, weights=np.where(won, stake, 0.0), minlength=n_markets)
+    has_winners = pool_win > 0
+    fee_m = np.where(has_winners, pool_total * fee_rate, 0.0)
+    net_m = pool_total - fee_m
+
+    # Winners share the net pool pro rata; refund everyone if nobody won
+    share = np.divide(net_m, pool_win, out=np.zeros(n_markets), where=has_winners)
+    refund = ~has_winners[codes]
+    payout = np.where(refund, stake, np.where(won, stake * share[codes], 0.0))
+    fee = np.where(refund, 0.0, stake * fee_rate)
+
+    per_bet = b.assign(
+        resolved_outcome=resolved[codes],
+        won=won,
+        payout=payout,
+        fee=fee,
+        pnl=payout - stake,
+    )
+
+    per_user = per_bet.groupby("user", as_index=False, observed=True).agg(
+        bets=("bet_amount", "size"),
+        staked=("bet_amount", "sum"),
+        payout=("payout", "sum"),
+        fee=("fee", "sum"),
+        pnl=("pnl", "sum"),
+    ).sort_values("pnl", ascending=False).reset_index(drop=True)
+
+    per_market = pd.DataFrame({
+        "market_id": market_ids,
+        "resolved_outcome": resolved,
+        "pool_total": pool_total,
+        "pool_winning": pool_win,
+        "fee": fee_m,
+        "payout_total": np.bincount(codes, weights=payout, minlength=n_markets),
+        "refunded": ~has_winners,
+    }).sort_values("market_id").reset_index(drop=True)
+
+    return per_bet, per_user, per_market
+
+
+def write_outputs(outdir, per_bet, per_user, per_market, fmt="csv"):
+    """Write settlement tables as CSV or Parquet (Parquet requires pyarrow)."""
+    paths = []
+    for name, frame in [("bets", per_bet), ("users", per_user), ("markets", per_market)]:
+        path = os.path.join(outdir, f"sf_settlement_{name}.{fmt}")
+        if fmt == "parquet":
+            frame.to_parquet(path, index=False)
+        else:
+            frame.to_csv(path, index=False)
+        paths.append(path)
+    return paths
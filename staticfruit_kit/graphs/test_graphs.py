@@ -131,6 +131,739 @@ def test_pool_distribution_chart():
 
     print("✅ Pool distribution chart saved as test_pool_distribution.png")
 
+def test_sharded_aggregates():
+    """Test that sharded aggregation matches the single-process result"""
+    print("🧪 Testing sharded aggregates...")
+    import numpy as np
+    from aggregates import aggregate
+
+    rng = np.random.default_rng(7)
+    n = 2000
+    bets = pd.DataFrame({
+        'market_id': rng.integers(1, 9, n),
+        'user': pd.Categorical([f'0x{u:040x}' for u in rng.integers(0, 50, n)]),
+        'bet_amount': rng.uniform(1, 100, n).round(2),
+        'outcome': rng.integers(0, 2, n).astype('int8'),
+        'ts': pd.Timestamp('2025-08-15') + pd.to_timedelta(rng.integers(0, 10 * 86400, n), unit='s'),
+        'odds_yes_estimate': rng.uniform(0, 1, n),
+    })
+    bets['date'] = bets['ts'].dt.normalize()
+
+    single = aggregate(bets, workers=1)
+    sharded = aggregate(bets, workers=3)
+    for key, sort_cols in [('pools', ['market_id', 'outcome']),
+                           ('user_totals', ['user']),
+                           ('daily', ['market_id', 'date'])]:
+        a = single[key].sort_values(sort_cols).reset_index(drop=True)
+        b = sharded[key].sort_values(sort_cols).reset_index(drop=True)
+        pd.testing.assert_frame_equal(a, b, check_categorical=False)
+
+    # The user table built on the sharded totals matches the one-pass table
+    from user_analytics import user_table
+    pd.testing.assert_frame_equal(user_table(bets, totals=sharded['user_totals']), user_table(bets))
+
+    print("✅ Sharded aggregates match single-process results")
+
+def test_settlement():
+    """Test parimutuel settlement payouts, fees and refunds"""
+    print("🧪 Testing settlement...")
+    from settlement import settle
+
+    markets = pd.DataFrame({'market_id': [1, 2, 3], 'resolved_outcome': [1, 0, None]})
+    bets = pd.DataFrame({
+        'ts': pd.date_range('2025-08-15', periods=6, freq='h'),
+        'market_id': [1, 1, 1, 2, 2, 3],
+        'user': ['0xa', '0xb', '0xc', '0xa', '0xb', '0xc'],
+        'bet_amount': [30.0, 10.0, 60.0, 20.0, 5.0, 7.0],
+        'outcome': [1, 1, 0, 1, 1, 0],
+    })
+
+    per_bet, per_user, per_market = settle(bets, markets, fee_bps=100)
+
+    # Market 1: pool 100, 1% fee, winners (40 staked) split 99
+    m1 = per_bet[per_bet['market_id'] == 1]
+    assert list(m1['payout'].round(4)) == [74.25, 24.75, 0.0]
+    # Market 2: nobody backed NO, so everyone is refunded with no fee
+    m2 = per_bet[per_bet['market_id'] == 2]
+    assert list(m2['payout']) == [20.0, 5.0] and m2['fee'].sum() == 0
+    # Market 3 is unresolved and not settled
+    assert 3 not in set(per_market['market_id'])
+    assert abs((per_market['payout_total'] + per_market['fee'] - per_market['pool_total']).sum()) < 1e-9
+    assert abs(per_user['pnl'].sum() + per_market['fee'].sum()) < 1e-9
+
+    print("✅ Settlement payouts conserve each pool")
+
+def test_report_plan_args():
+    """Test that report plan entries become live-script options"""
+    print("🧪 Testing report plan options...")
+    from report_plan import report_args, key, SOURCE_KEYS, FILTER_KEYS
+
+    plan = {
+        'defaults': {'mode': 'csv', 'markets': 'm.csv', 'bets': 'b.csv'},
+        'reports': [
+            {'name': 'all', 'outdir': 'out/all', 'anomalies': True},
+            {'name': 'm1', 'outdir': 'out/m1', 'market-ids': [1, 3], 'odds_interval': '1h'},
+        ],
+    }
+    (_, a), (_, b) = report_args(plan)
+
+    assert a.anomalies and not b.anomalies
+    assert b.market_ids == [1, 3] and b.odds_interval == '1h'
+    # Same source, so both reports share one load; different filters
+    assert key(a, SOURCE_KEYS) == key(b, SOURCE_KEYS)
+    assert key(a, FILTER_KEYS) != key(b, FILTER_KEYS)
+
+    print("✅ Report plan options parsed")
+
+def test_storage_retention():
+    """Test latest.json updates and version retention"""
+    print("🧪 Testing storage retention...")
+    import datetime as dt
+    from retention import expired, update_latest, referenced_keys
+
+    def variants(ts, chart='market_pools'):
+        return [{'variant': '1x', 'format': 'png', 'path': f'{ts}_{chart}.png', 'sha256': ts},
+                {'variant': 'thumb', 'format': 'png', 'path': f'{ts}_{chart}.thumb.png', 'sha256': ts}]
+
+    old = update_latest({}, {'market_pools': variants('20250101_000000'),
+                             'leaderboard': variants('20250101_000000', 'leaderboard')}, 't0')
+    latest = update_latest(old, {'market_pools': variants('20250305_000000')}, 't1',
+                           report='20250305_000000_staticfruit_report.pdf')
+    assert latest['charts']['market_pools']['key'] == '20250305_000000_market_pools.png'
+    # Charts missing from this run keep their previous entry
+    assert latest['charts']['leaderboard'] == old['charts']['leaderboard']
+
+    names = ['latest.json'] + [f'2025030{d}_000000_market_pools.png' for d in range(1, 6)] + \
+            ['20250101_000000_market_pools.png', '20250101_000000_leaderboard.png']
+    doomed = expired(names, keep_versions=3, max_age_days=30, now=dt.datetime(2025, 3, 6),
+                     protected=referenced_keys(latest))
+    # Beyond the newest 3 runs, or older than 30 days, but never what latest.json points at
+    assert sorted(doomed) == ['20250101_000000_market_pools.png', '20250301_000000_market_pools.png',
+                              '20250302_000000_market_pools.png']
+
+    print("✅ Retention keeps recent and referenced versions")
+
+def test_render_scheduler():
+    """Test render priority, coalescing, bounded queue and rate limit"""
+    print("🧪 Testing render scheduler...")
+    from render_scheduler import RenderScheduler
+
+    rendered = []
+    sched = RenderScheduler(rendered.append, max_queue=3, rate=2.0, deadline_horizon=3600,
+                            weights={'deadline': 2.0})
+    sched.set_deadlines({1: 10_000 + 600, 2: 10_000 + 86_400})
+    for market_id, amount in [(2, 5.0), (3, 500.0), (2, 5.0), (2, 5.0), (1, 5.0)]:
+        sched.note_bet(market_id, amount, now=10_000)
+        sched.submit(market_id, now=10_000)
+    # Repeated updates to market 2 coalesce into one job
+    assert sorted(sched.pending) == [1, 2, 3]
+
+    # Full queue: the lowest priority job (far deadline, low volume) is dropped
+    sched.note_request(4, now=10_000)
+    sched.submit(4, now=10_000)
+    assert 2 not in sched.pending and sched.dropped == 1
+
+    # Closest deadline first, then requested and busy markets, at most `rate` per second
+    assert sched.run_pending(now=10_000) == [1]
+    sched.note_bet(4, 5.0, now=10_001)
+    assert sched.run_pending(now=10_001) == [4, 3]
+    assert rendered == [1, 4, 3] and not sched.pending
+
+    print("✅ Render scheduler orders by priority")
+
+def test_chart_data():
+    """Test downsampled and pre-binned chart data series"""
+    print("🧪 Testing chart data...")
+    import numpy as np
+    from chart_data import lttb, histogram
+
+    x = np.arange(10_000)
+    y = np.sin(x / 500.0)
+    y[4321] = 5.0  # a spike the downsampled line must keep
+    keep = lttb(x, y, 200)
+    assert len(keep) == 200 and keep[0] == 0 and keep[-1] == len(x) - 1
+    assert np.all(np.diff(keep) > 0) and 4321 in keep
+    assert len(lttb(x[:50], y[:50], 200)) == 50
+
+    hist = histogram([1, 10, 100, 1000, 0], bins=3)
+    assert hist['counts'] == [1, 1, 2] and len(hist['edges']) == 4 and hist['scale'] == 'log'
+
+    # Per-market payloads come from one grouping; market 3 has a pool row but no bets
+    from chart_data import market_payloads
+    from odds import implied_odds
+    bets = pd.DataFrame({'ts': pd.date_range('2025-08-16', periods=5, freq='h'),
+                         'market_id': [2, 1, 2, 1, 2], 'bet_amount': [1.0, 2.0, 4.0, 8.0, 16.0],
+                         'outcome': [1, 0, 0, 1, 1]})
+    data = {'bets': bets, 'odds_history': implied_odds(bets), 'titles': {1: 'One'},
+            'pool_tot': pd.DataFrame({'market_id': [1, 2, 3], 'market_title': ['One', 'Two', 'Three'],
+                                      'pool_yes': [8.0, 17.0, 0.0], 'pool_no': [2.0, 4.0, 0.0]}),
+            'volume_matrix': pd.DataFrame({pd.Timestamp('2025-08-16'): [2, 3]}, index=[1, 2])}
+    payloads = dict(market_payloads(data))
+    assert list(payloads) == [1, 2, 3] and payloads[1]['title'] == 'One'
+    assert payloads[2]['odds']['p_yes'] == [1.0, 0.2, 0.8095]
+    assert sum(payloads[2]['histogram']['counts']) == 3 and payloads[2]['daily_bets']['bets'] == [3]
+    assert payloads[3]['odds'] == {'ts': [], 'p_yes': []} and payloads[3]['daily_bets']['bets'] == []
+
+    print("✅ Chart data keeps peaks within the point budget")
+
+def test_http_cache():
+    """Test conditional requests reuse the cached frame on 304"""
+    print("🧪 Testing REST response cache...")
+    import tempfile
+    from http_cache import get_frame
+
+    class Response:
+        def __init__(self, status_code, body=None, headers=None):
+            self.status_code, self.body, self.headers = status_code, body, headers or {}
+        def json(self):
+            return self.body
+        def raise_for_status(self):
+            assert self.status_code < 400
+
+    class Server:
+        etag = '"v1"'
+        def __init__(self):
+            self.sent = []
+        def get(self, url, params=None, headers=None, timeout=None):
+            self.sent.append(headers)
+            if headers.get('If-None-Match') == self.etag:
+                return Response(304)
+            return Response(200, [{'market_id': 1, 'title': self.etag}], {'ETag': self.etag})
+
+    server = Server()
+    with tempfile.TemporaryDirectory() as cache:
+        first = get_frame(server, 'http://api/markets', cache_dir=cache)
+        again = get_frame(server, 'http://api/markets', cache_dir=cache)
+        assert 'If-None-Match' not in server.sent[0] and server.sent[1]['If-None-Match'] == '"v1"'
+        pd.testing.assert_frame_equal(first, again)
+
+        server.etag = '"v2"'
+        changed = get_frame(server, 'http://api/markets', cache_dir=cache)
+        assert changed['title'][0] == '"v2"'
+
+    print("✅ Unchanged responses come from the cache")
+
+def test_calibration():
+    """Test Brier score, log loss and reliability against hand-computed values"""
+    print("🧪 Testing odds calibration...")
+    import numpy as np
+    from calibration import forecasts, scores, reliability
+
+    markets = pd.DataFrame({'market_id': [1, 2, 3], 'resolved_outcome': [1, 0, None],
+                            'deadline': pd.to_datetime(['2025-08-20', '2025-08-20', '2025-08-20'])})
+    bets = pd.DataFrame({
+        'ts': pd.to_datetime(['2025-08-10 00:00', '2025-08-19 20:00', '2025-08-10 00:00', '2025-08-19 23:30',
+                              '2025-08-10 00:00']),
+        'market_id': [1, 1, 2, 2, 3],
+        'bet_amount': [10.0, 30.0, 10.0, 10.0, 10.0],
+        'outcome': [1, 1, 0, 1, 1],
+        'odds_yes_estimate': [0.8, 0.9, 0.4, 0.2, 0.5],
+    })
+
+    f = forecasts(bets, markets)
+    # Market 3 is unresolved; an estimate for each of the other 4 bets, and a
+    # pool forecast for every bet but each market's first
+    assert len(f) == 6 and set(f['market_id']) == {1, 2}
+
+    s = scores(f).set_index(['level', 'source', 'group'])
+    est = s.loc[('overall', 'estimate', 'all')]
+    assert est['n'] == 4
+    assert abs(est['brier'] - np.mean([0.2**2, 0.1**2, 0.4**2, 0.2**2])) < 1e-12
+    assert abs(est['log_loss'] - np.mean(-np.log([0.8, 0.9, 0.6, 0.8]))) < 1e-12
+    # Pool-implied odds before each market's second bet: 1.0 for market 1, 0.0 for market 2
+    pool = s.loc[('overall', 'pool', 'all')]
+    assert pool['n'] == 2 and pool['brier'] < 1e-9
+    assert list(f.loc[f['source'] == 'pool', 'ts']) == list(bets['ts'].iloc[[1, 3]])
+    assert s.loc[('to_deadline', 'estimate', '<1h')]['n'] == 1
+    assert s.loc[('to_deadline', 'estimate', '>7d')]['n'] == 2
+
+    r = reliability(f[f['source'] == 'estimate'], bins=5).set_index('bin')
+    assert list(r.index) == [1, 2, 4] and r.loc[4, 'observed_rate'] == 1.0
+
+    print("✅ Calibration scores match hand-computed values")
+
+def test_batch_manifest():
+    """Test batch mode renders many graphs from shared and inline inputs"""
+    print("🧪 Testing batch graph generation...")
+    import tempfile
+    from generate_graph import batch_jobs, run_batch
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pools_csv = os.path.join(tmp, 'pools.csv')
+        pd.DataFrame({'market_id': [1, 2, 3], 'pool_yes': [10.0, 20.0, 30.0],
+                      'pool_no': [5.0, 15.0, 25.0]}).to_csv(pools_csv, index=False)
+        manifest = {'jobs': [
+            {'type': 'pools', 'data': pools_csv, 'market_id': m, 'output': os.path.join(tmp, f'pools_{m}.png')}
+            for m in (1, 2, 3)
+        ] + [
+            {'type': 'leaderboard', 'data': [{'address': '0xabc', 'total_staked': 50}],
+             'output': os.path.join(tmp, 'leaderboard.json'), 'format': 'json'},
+        ]}
+
+        jobs = batch_jobs(manifest)
+        # One market's rows per job, all sliced from a single read of the CSV
+        assert [list(frame['market_id']) for _, frame, _, _ in jobs[:3]] == [[1], [2], [3]]
+
+        assert run_batch(manifest) == 0
+        assert all(os.path.exists(os.path.join(tmp, f'pools_{m}.png')) for m in (1, 2, 3))
+        assert os.path.exists(os.path.join(tmp, 'leaderboard.json'))
+
+        # A bad format is rejected up front, like a bad type
+        bad = {'jobs': [{'type': 'pools', 'data': pools_csv, 'output': os.path.join(tmp, 'p.svg'), 'format': 'svg'}]}
+        try:
+            batch_jobs(bad)
+            assert False, "expected SystemExit"
+        except SystemExit as e:
+            assert 'format' in str(e)
+
+    print("✅ Batch manifest generated every graph")
+
+def test_store_not_refreshed_from_filtered_load():
+    """Test a filtered load never overwrites store partitions with a slice"""
+    print("🧪 Testing store refresh with filters...")
+    import tempfile
+    import staticfruit_graphs_live as live
+    import bet_store
+
+    with tempfile.TemporaryDirectory() as tmp:
+        markets_csv, bets_csv = os.path.join(tmp, 'markets.csv'), os.path.join(tmp, 'bets.csv')
+        pd.DataFrame({'market_id': [1, 2], 'title': ['A', 'B']}).to_csv(markets_csv, index=False)
+        pd.DataFrame({
+            'ts': pd.date_range('2025-08-16', periods=8, freq='2h').strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'market_id': [1, 2] * 4,
+            'user': ['0xa', '0xb', '0xc', '0xd'] * 2,
+            'bet_amount': [10.0] * 8,
+            'outcome': [1, 0] * 4,
+        }).to_csv(bets_csv, index=False)
+        store = os.path.join(tmp, 'store')
+        parser = live.build_parser()
+        base = ['--mode', 'csv', '--markets', markets_csv, '--bets', bets_csv, '--store', store]
+
+        live.load(parser.parse_args(base))
+        live.load(parser.parse_args(base + ['--market-ids', '2', '--since', '2025-08-16T05:00',
+                                            '--until', '2025-08-16T09:00']))
+        markets, bets = bet_store.read(store)
+        assert len(bets) == 8 and sorted(markets['market_id']) == [1, 2]
+
+        # markets.parquet is merged, not replaced, by a partial write
+        bet_store.write(store, pd.DataFrame({'market_id': [2], 'title': ['B2']}), bets.iloc[:0])
+        markets, _ = bet_store.read(store)
+        assert list(markets['title']) == ['A', 'B2']
+
+    print("✅ Store keeps full partitions on filtered loads")
+
+def test_anomaly_detector():
+    """Test whale, burst and odds-swing flags, and the empty result"""
+    print("🧪 Testing anomaly detector...")
+    from anomalies import AnomalyDetector
+
+    start = pd.Timestamp('2025-08-16')
+    rows = [(start + pd.Timedelta(hours=i), 1, f'0x{i:02d}', 10.0 + i % 3, i % 2) for i in range(20)]
+    rows.append((start + pd.Timedelta(hours=20), 1, '0xwhale', 10_000.0, 1))
+    rows += [(start + pd.Timedelta(hours=30, seconds=i), 2, '0xbot', 5.0, 1) for i in range(12)]
+    bets = pd.DataFrame(rows, columns=['ts', 'market_id', 'user', 'bet_amount', 'outcome'])
+
+    flags = AnomalyDetector(min_bets=10).run(bets)
+    kinds = dict(zip(flags['kind'], flags['user']))
+    assert kinds == {'whale': '0xwhale', 'odds_swing': '0xwhale', 'burst': '0xbot'}
+    # one burst flag per window, at the 10th bet
+    burst = flags[flags['kind'] == 'burst']
+    assert len(burst) == 1 and burst['ts'].iloc[0] == start + pd.Timedelta(hours=30, seconds=9)
+    assert flags.loc[flags['kind'] == 'odds_swing', 'score'].iloc[0] > 0.15
+
+    # Quiet data: no flags, but still a typed frame that can be ranked
+    quiet = AnomalyDetector().run(bets.head(5))
+    assert quiet.empty and quiet['score'].dtype == 'float64'
+    assert str(quiet['ts'].dtype) == 'datetime64[ns]'
+    assert quiet.nlargest(5, 'score').empty
+
+    print("✅ Anomaly detector flags whales, bursts and odds swings")
+
+def test_user_analytics():
+    """Test the per-user table and leaderboard ranking"""
+    print("🧪 Testing user analytics...")
+    from settlement import settle
+    from user_analytics import user_table, leaderboard
+
+    markets = pd.DataFrame({'market_id': [1, 2], 'resolved_outcome': [1, None]})
+    bets = pd.DataFrame({
+        'ts': pd.date_range('2025-08-15', periods=5, freq='h'),
+        'market_id': [1, 1, 2, 2, 2],
+        'user': pd.Categorical(['0xa', '0xb', '0xa', '0xc', '0xc']),
+        'bet_amount': [30.0, 10.0, 20.0, 5.0, 15.0],
+        'outcome': [1, 0, 0, 1, 1],
+    })
+    per_bet, _, _ = settle(bets, markets)
+    users = user_table(bets, per_bet).set_index('user')
+
+    assert users.loc['0xa', 'bets'] == 2 and users.loc['0xa', 'bet_amount'] == 50.0
+    assert users.loc['0xa', 'markets'] == 2 and users.loc['0xc', 'median_bet'] == 10.0
+    assert abs(users.loc['0xa', 'yes_share'] - 0.6) < 1e-6
+    # 0xa wins market 1's whole pool (40), 0xb loses their 10
+    assert users.loc['0xa', 'realized_pnl'] == 10.0 and users.loc['0xb', 'realized_pnl'] == -10.0
+    assert users.loc['0xa', 'hit_rate'] == 1.0 and users.loc['0xb', 'hit_rate'] == 0.0
+    # 0xc only bet on the open market: no realized PnL rather than 0
+    assert pd.isna(users.loc['0xc', 'realized_pnl']) and users.loc['0xc', 'resolved_bets'] == 0
+
+    top = leaderboard(users.reset_index(), 'realized_pnl')
+    assert list(top['user']) == ['0xa', '0xb']
+    assert list(leaderboard(users.reset_index(), 'bet_amount', n=2)['user']) == ['0xa', '0xc']
+
+    print("✅ User analytics rank only users with a value")
+
+def test_bet_log_round_trip():
+    """Test appending to the bet log and reading it back with filters"""
+    print("🧪 Testing bet log round trip...")
+    import tempfile
+    import bet_log
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = os.path.join(tmp, 'log')
+        start = pd.Timestamp('2025-08-16')
+        # Epoch seconds in the first batch, epoch milliseconds in the second
+        first = pd.DataFrame({
+            'ts': [int((start + pd.Timedelta(hours=h)).timestamp()) for h in (0, 1, 2)],
+            'market_id': [1, 2, 1], 'user': ['0xa', '0xb', '0xa'],
+            'bet_amount': [10.0, 20.0, 30.0], 'outcome': [1, 0, 1],
+        })
+        second = pd.DataFrame({
+            'ts': [int((start + pd.Timedelta(hours=h)).timestamp() * 1000) for h in (3, 4)],
+            'market_id': [2, 1], 'user': ['0xb', '0xc'],
+            'amount': [40.0, 50.0], 'outcome': [1, 0],
+        })
+        assert bet_log.append(log, first) == 3 and bet_log.append(log, second) == 2
+        # Users seen in both batches are interned once
+        with open(os.path.join(log, 'users.txt'), encoding='utf-8') as f:
+            assert f.read().splitlines() == ['0xa', '0xb', '0xc']
+
+        bets = bet_log.read(log)
+        assert list(bets['ts']) == [start + pd.Timedelta(hours=h) for h in range(5)]
+        assert list(bets['user']) == ['0xa', '0xb', '0xa', '0xb', '0xc']
+        assert list(bets['bet_amount']) == [10.0, 20.0, 30.0, 40.0, 50.0]
+        assert 'odds_yes_estimate' not in bets.columns
+
+        sliced = bet_log.read(log, market_ids=[1], since=start + pd.Timedelta(hours=1),
+                              until=start + pd.Timedelta(hours=4))
+        assert list(sliced['bet_amount']) == [30.0] and list(sliced['user']) == ['0xa']
+
+        # A writer caught mid-append: the partial record is not mapped
+        with open(os.path.join(log, 'bets.bin'), 'ab') as f:
+            f.write(b'\0' * (bet_log.RECORD_DTYPE.itemsize // 2))
+        assert len(bet_log.open_log(log)) == 5
+        assert len(bet_log.read(log)) == 5
+
+        # The next append cuts the partial record (and a partial user line) off first
+        with open(os.path.join(log, 'users.txt'), 'a', encoding='utf-8') as f:
+            f.write('0xdea')
+        bet_log.append(log, pd.DataFrame({'ts': [start + pd.Timedelta(hours=5)], 'market_id': [2],
+                                          'user': ['0xd'], 'bet_amount': [60.0], 'outcome': [1]}))
+        bets = bet_log.read(log)
+        assert list(bets['ts']) == [start + pd.Timedelta(hours=h) for h in range(6)]
+        assert list(bets['user'])[-2:] == ['0xc', '0xd'] and bets['bet_amount'].iloc[-1] == 60.0
+
+    print("✅ Bet log reads back what was appended")
+
+def test_bet_store_filters():
+    """Test the bet store prunes partitions and trims rows by ts"""
+    print("🧪 Testing bet store filters...")
+    import tempfile
+    import bet_store
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = os.path.join(tmp, 'store')
+        markets = pd.DataFrame({'market_id': [1, 2], 'title': ['A', 'B']})
+        bets = pd.DataFrame({
+            'ts': pd.to_datetime(['2025-08-16 10:00', '2025-08-16 22:00', '2025-08-17 03:00',
+                                  '2025-08-16 12:00', '2025-08-18 09:00']),
+            'market_id': [1, 1, 1, 2, 2],
+            'user': ['0xa', '0xb', '0xa', '0xc', '0xc'],
+            'bet_amount': [10.0, 20.0, 30.0, 40.0, 50.0],
+            'outcome': [1, 0, 1, 0, 1],
+        })
+        bet_store.write(store, markets, bets)
+        assert sorted(os.listdir(os.path.join(store, 'bets', 'market_id=1'))) == ['day=2025-08-16', 'day=2025-08-17']
+
+        _, everything = bet_store.read(store)
+        assert list(everything.columns) == list(bets.columns) and len(everything) == 5
+
+        # Clobber market 2's files: a read filtered to market 1 must never open them
+        for day in os.listdir(os.path.join(store, 'bets', 'market_id=2')):
+            day_dir = os.path.join(store, 'bets', 'market_id=2', day)
+            for name in os.listdir(day_dir):
+                with open(os.path.join(day_dir, name), 'wb') as f:
+                    f.write(b'not parquet')
+
+        # since/until land mid-day: whole days are pruned, ts trims the rest
+        m, sliced = bet_store.read(store, market_ids=[1], since=pd.Timestamp('2025-08-16 12:00'),
+                                   until=pd.Timestamp('2025-08-17 03:00'))
+        assert list(m['market_id']) == [1]
+        assert list(sliced['bet_amount']) == [20.0]
+        assert list(sliced['ts']) == [pd.Timestamp('2025-08-16 22:00')]
+
+    print("✅ Bet store reads only the matching slice")
+
+def test_implied_odds():
+    """Test running pool odds and the as-of interval sampling"""
+    print("🧪 Testing pool-implied odds...")
+    from odds import implied_odds, sample_asof
+
+    # Out of time order on purpose
+    bets = pd.DataFrame({
+        'ts': pd.to_datetime(['2025-08-16 03:20', '2025-08-16 00:10', '2025-08-16 02:05', '2025-08-16 00:40']),
+        'market_id': [1, 1, 2, 1],
+        'bet_amount': [20.0, 10.0, 10.0, 30.0],
+        'outcome': [1, 1, 0, 0],
+    })
+    history = implied_odds(bets)
+    assert history['ts'].is_monotonic_increasing
+    assert list(history['market_id']) == [1, 1, 2, 1]
+    assert list(history['pool_yes']) == [10.0, 10.0, 0.0, 30.0]
+    assert list(history['pool_no']) == [0.0, 30.0, 10.0, 30.0]
+    assert list(history['p_yes']) == [1.0, 0.25, 0.0, 0.5]
+
+    hourly = sample_asof(history, '1h')
+    start = pd.Timestamp('2025-08-16')
+    m1 = hourly[hourly['market_id'] == 1]
+    # Last value in each hour, carried forward through the quiet 01:00 and 02:00 buckets
+    assert list(m1['ts']) == [start + pd.Timedelta(hours=h) for h in range(4)]
+    assert list(m1['p_yes']) == [0.25, 0.25, 0.25, 0.5]
+    # Market 2 opens at 02:05; earlier buckets are left out rather than filled
+    m2 = hourly[hourly['market_id'] == 2]
+    assert list(m2['ts']) == [start + pd.Timedelta(hours=2), start + pd.Timedelta(hours=3)]
+    assert list(m2['p_yes']) == [0.0, 0.0]
+
+    print("✅ Implied odds follow the running pools")
+
+def test_no_settlement_in_time_window():
+    """Test a --since/--until window never settles on a partial pool"""
+    print("🧪 Testing settlement with a time window...")
+    import tempfile
+    import staticfruit_graphs_live as live
+
+    with tempfile.TemporaryDirectory() as tmp:
+        markets_csv, bets_csv = os.path.join(tmp, 'markets.csv'), os.path.join(tmp, 'bets.csv')
+        pd.DataFrame({'market_id': [1, 2], 'title': ['A', 'B'],
+                      'resolved_outcome': [1, None]}).to_csv(markets_csv, index=False)
+        pd.DataFrame({
+            'ts': pd.date_range('2025-08-16', periods=6, freq='12h').strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'market_id': [1, 1, 1, 2, 1, 2],
+            'user': ['0xa', '0xb', '0xc', '0xa', '0xb', '0xc'],
+            'bet_amount': [10.0, 20.0, 30.0, 40.0, 50.0, 60.0],
+            'outcome': [1, 0, 1, 0, 0, 1],
+        }).to_csv(bets_csv, index=False)
+        parser = live.build_parser()
+        base = ['--mode', 'csv', '--markets', markets_csv, '--bets', bets_csv]
+
+        # A market filter keeps each market's whole pool, so it still settles
+        args = parser.parse_args(base + ['--market-ids', '1', '--outdir', os.path.join(tmp, 'm1')])
+        data = live.compute(args, *live.load(args))
+        assert list(data['settled_markets']['pool_total']) == [110.0]
+
+        args = parser.parse_args(base + ['--since', '2025-08-17', '--outdir', os.path.join(tmp, 'window')])
+        data = live.compute(args, *live.load(args))
+        assert data['settled_markets'].empty and data['settled_bets'].empty
+        assert data['user_stats']['realized_pnl'].isna().all()
+        live.write_tables(args, data)
+        assert not [f for f in os.listdir(args.outdir) if f.startswith('sf_settlement')]
+
+    print("✅ Time windows skip settlement")
+
+def test_odds_seeded_before_since():
+    """Test --since odds match the full history, seeded with the earlier pools"""
+    print("🧪 Testing odds in a --since window...")
+    import tempfile
+    import staticfruit_graphs_live as live
+    import calibration
+
+    with tempfile.TemporaryDirectory() as tmp:
+        markets_csv, bets_csv = os.path.join(tmp, 'markets.csv'), os.path.join(tmp, 'bets.csv')
+        pd.DataFrame({'market_id': [1, 2, 3], 'title': ['A', 'B', 'C'],
+                      'resolved_outcome': [1, 0, None]}).to_csv(markets_csv, index=False)
+        pd.DataFrame({
+            'ts': pd.date_range('2025-08-16', periods=8, freq='12h').strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'market_id': [1, 2, 1, 3, 1, 2, 1, 2],
+            'user': ['0xa', '0xb', '0xc', '0xa', '0xb', '0xc', '0xa', '0xb'],
+            'bet_amount': [10.0, 20.0, 30.0, 40.0, 50.0, 60.0, 70.0, 80.0],
+            'outcome': [1, 0, 0, 1, 1, 1, 0, 1],
+        }).to_csv(bets_csv, index=False)
+        parser = live.build_parser()
+        base = ['--mode', 'csv', '--markets', markets_csv, '--bets', bets_csv, '--outdir', tmp]
+        since = '2025-08-17T12:00'
+
+        full = live.compute(parser.parse_args(base), *live.load(parser.parse_args(base)))
+        args = parser.parse_args(base + ['--since', since])
+        markets, bets = live.load(args)
+        assert len(bets) == 5
+        # Market 1 had 10 YES + 30 NO before the window; market 3 had nothing
+        opening = markets.set_index('market_id')
+        assert list(opening.loc[1, ['open_pool_yes', 'open_pool_no']]) == [10.0, 30.0]
+        assert list(opening.loc[3, ['open_pool_yes', 'open_pool_no']]) == [0.0, 0.0]
+
+        windowed = live.compute(args, markets, bets)
+        expected = full['odds_history'][full['odds_history']['ts'] >= pd.Timestamp(since)]
+        pd.testing.assert_frame_equal(windowed['odds_history'], expected.reset_index(drop=True),
+                                      check_dtype=False)
+
+        # The window's first bet in each market is scored on the pools from before it
+        f = calibration.forecasts(windowed['bets'], markets, windowed['odds_history'])
+        first = f[(f['source'] == 'pool') & (f['ts'] == pd.Timestamp('2025-08-18'))]
+        assert list(first['market_id']) == [1] and list(first['p']) == [0.25]
+
+    print("✅ Windowed odds match the full history")
+
+def test_calibration_no_resolved_bets():
+    """Test forecasts is empty, not an error, when no resolved market has bets"""
+    print("🧪 Testing calibration with nothing to score...")
+    import tempfile
+    import staticfruit_graphs_live as live
+    from calibration import forecasts
+
+    markets = pd.DataFrame({'market_id': [1], 'resolved_outcome': [1.0],
+                            'deadline': pd.to_datetime(['2025-08-20'])})
+    bets = pd.DataFrame({'ts': pd.to_datetime(['2025-08-16']), 'market_id': [2],
+                         'bet_amount': [10.0], 'outcome': [1]})
+    f = forecasts(bets, markets)
+    assert f.empty and list(f.columns) == ['market_id', 'ts', 'source', 'p', 'y', 'to_deadline']
+    assert f['p'].dtype == 'float64' and f['ts'].dtype == 'datetime64[ns]'
+
+    # The same through the live script: a market id that matches nothing
+    with tempfile.TemporaryDirectory() as tmp:
+        markets_csv, bets_csv = os.path.join(tmp, 'markets.csv'), os.path.join(tmp, 'bets.csv')
+        pd.DataFrame({'market_id': [1], 'title': ['A'], 'deadline': ['2025-08-20T00:00:00Z'],
+                      'resolved_outcome': [1]}).to_csv(markets_csv, index=False)
+        pd.DataFrame({'ts': ['2025-08-16T00:00:00Z'], 'market_id': [1], 'user': ['0xa'],
+                      'bet_amount': [10.0], 'outcome': [1]}).to_csv(bets_csv, index=False)
+        args = live.build_parser().parse_args(['--mode', 'csv', '--markets', markets_csv, '--bets', bets_csv,
+                                               '--market-ids', '99', '--outdir', tmp])
+        data = live.compute(args, *live.load(args))
+        assert data['calibration_scores'] is None
+
+    print("✅ Calibration handles runs with nothing to score")
+
+def test_report_plan_memoization():
+    """Test a plan shares loads and aggregates between reports that can share them"""
+    print("🧪 Testing report plan memoization...")
+    import tempfile
+    import staticfruit_graphs_live as live
+    import report_plan
+
+    with tempfile.TemporaryDirectory() as tmp:
+        markets_csv, bets_csv = os.path.join(tmp, 'markets.csv'), os.path.join(tmp, 'bets.csv')
+        pd.DataFrame({'market_id': [1, 2], 'title': ['A', 'B'],
+                      'resolved_outcome': [1, 0]}).to_csv(markets_csv, index=False)
+        pd.DataFrame({
+            'ts': pd.date_range('2025-08-16', periods=6, freq='6h').strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'market_id': [1, 2, 1, 2, 1, 2],
+            'user': ['0xa', '0xb', '0xc', '0xa', '0xb', '0xc'],
+            'bet_amount': [10.0, 20.0, 30.0, 40.0, 50.0, 60.0],
+            'outcome': [1, 0, 0, 1, 1, 0],
+        }).to_csv(bets_csv, index=False)
+        plan = {
+            'defaults': {'mode': 'csv', 'markets': markets_csv, 'bets': bets_csv, 'output': 'data'},
+            'reports': [
+                {'name': 'all', 'outdir': os.path.join(tmp, 'all'), 'anomalies': True},
+                {'name': 'pnl', 'outdir': os.path.join(tmp, 'pnl'), 'rank_by': 'realized_pnl', 'anomalies': True},
+                {'name': 'm1', 'outdir': os.path.join(tmp, 'm1'), 'market_ids': [1]},
+            ],
+        }
+
+        calls = {'load': 0, 'compute_shared': 0, 'anomalies': 0}
+        originals = {name: getattr(live, name) for name in ('load', 'compute_shared')}
+        run_detector = live.anomalies.AnomalyDetector.run
+
+        def counted(name, fn):
+            def wrapper(*a, **kw):
+                calls[name] += 1
+                return fn(*a, **kw)
+            return wrapper
+
+        live.load = counted('load', originals['load'])
+        live.compute_shared = counted('compute_shared', originals['compute_shared'])
+        live.anomalies.AnomalyDetector.run = counted('anomalies', run_detector)
+        try:
+            done = report_plan.run(plan, workers=1)
+        finally:
+            for name, fn in originals.items():
+                setattr(live, name, fn)
+            live.anomalies.AnomalyDetector.run = run_detector
+
+        assert set(done) == {'all', 'pnl', 'm1'}
+        # One load for the shared source; 'all' and 'pnl' share aggregates and anomaly flags
+        assert calls == {'load': 1, 'compute_shared': 2, 'anomalies': 1}
+        assert list(pd.read_csv(os.path.join(tmp, 'all', 'sf_leaderboard.csv')).columns) == ['user', 'bet_amount']
+        assert list(pd.read_csv(os.path.join(tmp, 'pnl', 'sf_leaderboard.csv')).columns) == ['user', 'realized_pnl']
+        assert os.path.exists(os.path.join(tmp, 'pnl', 'sf_anomalies.csv'))
+        assert not os.path.exists(os.path.join(tmp, 'm1', 'sf_anomalies.csv'))
+
+    print("✅ Report plan reuses loads and aggregates")
+
+def test_renditions():
+    """Test every chart variant is written at its size, with a manifest entry"""
+    print("🧪 Testing chart renditions...")
+    import tempfile
+    from PIL import Image
+    from renditions import write_variants
+
+    fig = plt.figure(figsize=(8, 5))
+    plt.bar(['NO', 'YES'], [3, 5])
+    with tempfile.TemporaryDirectory() as tmp:
+        entries = write_variants(fig, tmp, 'chart', dpi=100)
+        plt.close(fig)
+
+        # Rendered once at 2x dpi (1600x1000), then resized
+        sizes = {'thumb': (400, 250), '1x': (800, 500), '2x': (1600, 1000)}
+        assert [(e['variant'], e['format']) for e in entries] == [
+            (v, f) for v in ('thumb', '1x', '2x') for f in ('png', 'webp')]
+        assert [e['path'] for e in entries[::2]] == ['chart.thumb.png', 'chart.png', 'chart@2x.png']
+        for e in entries:
+            path = os.path.join(tmp, e['path'])
+            assert (e['width'], e['height']) == sizes[e['variant']]
+            assert e['bytes'] == os.path.getsize(path)
+            with Image.open(path) as img:
+                assert img.size == sizes[e['variant']] and img.format == e['format'].upper()
+        assert sorted(os.listdir(tmp)) == sorted(e['path'] for e in entries)
+
+    print("✅ Renditions match their manifest entries")
+
+def test_normalize():
+    """Test timestamp parsing and compact dtypes in the live script's normalize step"""
+    print("🧪 Testing normalization...")
+    import numpy as np
+    from staticfruit_graphs_live import parse_ts, compact_ids, normalize
+
+    expected = [pd.Timestamp('2025-08-16 00:00'), pd.Timestamp('2025-08-16 01:30')]
+    # Epoch seconds and milliseconds, ISO strings with Z or an offset, tz-aware and naive datetimes
+    for raw in (pd.Series([1755302400, 1755307800]),
+                pd.Series([1755302400000, 1755307800000]),
+                pd.Series(['2025-08-16T00:00:00Z', '2025-08-16T01:30:00Z']),
+                pd.Series(['2025-08-16T02:00:00+02:00', '2025-08-16T03:30:00+02:00']),
+                pd.Series(pd.to_datetime(expected)).dt.tz_localize('UTC').dt.tz_convert('America/New_York'),
+                pd.Series(pd.to_datetime(expected))):
+        out = parse_ts(raw)
+        assert out.dt.tz is None and list(out) == expected, raw
+
+    a, b = compact_ids(pd.Series([1, 2, 3], dtype='int64'), pd.Series([2, 300], dtype='int64'))
+    assert a.dtype == b.dtype == np.int16 and list(b) == [2, 300]
+
+    markets = pd.DataFrame({'market_id': [1, 2], 'title': ['A', 'B'],
+                            'deadline': ['2025-08-20T00:00:00Z', '2025-08-21T00:00:00Z'],
+                            'resolved_outcome': ['1', None]})
+    bets = pd.DataFrame({'ts': [1755302400000, 1755307800000, 1755311400000], 'market_id': [1, 2, 2],
+                         'user': ['0xa', '0xb', '0xa'], 'bet_amount': ['10', '20.5', '3'],
+                         'outcome': [1, 0, 1], 'odds_yes_estimate': ['0.5', '0.4', None]})
+    markets, bets = normalize(markets, bets)
+    assert markets['market_id'].dtype == bets['market_id'].dtype == np.int8
+    assert pd.api.types.is_datetime64_dtype(markets['deadline']) and markets['deadline'].dt.tz is None
+    assert markets['deadline'][0] == pd.Timestamp('2025-08-20')
+    assert markets['resolved_outcome'].dtype == 'float64' and pd.isna(markets['resolved_outcome'][1])
+    assert list(bets['ts'])[:2] == expected
+    assert isinstance(bets['user'].dtype, pd.CategoricalDtype) and list(bets['user'].cat.categories) == ['0xa', '0xb']
+    assert bets['outcome'].dtype == np.int8
+    assert bets['bet_amount'].dtype == 'float64' and bets['bet_amount'].sum() == 33.5
+    assert bets['odds_yes_estimate'].dtype == 'float64'
+
+    print("✅ Normalization parses timestamps and compacts dtypes")
+
 def run_all_tests():
     """Run all chart generation tests"""
     print("🚀 Starting StaticFruit graph generation tests...\n")
@@ -139,6 +872,27 @@ def run_all_tests():
         test_market_pools_chart()
         test_leaderboard_chart()
         test_pool_distribution_chart()
+        test_sharded_aggregates()
+        test_settlement()
+        test_report_plan_args()
+        test_storage_retention()
+        test_render_scheduler()
+        test_chart_data()
+        test_http_cache()
+        test_calibration()
+        test_batch_manifest()
+        test_store_not_refreshed_from_filtered_load()
+        test_anomaly_detector()
+        test_user_analytics()
+        test_bet_log_round_trip()
+        test_bet_store_filters()
+        test_implied_odds()
+        test_no_settlement_in_time_window()
+        test_odds_seeded_before_since()
+        test_calibration_no_resolved_bets()
+        test_report_plan_memoization()
+        test_renditions()
+        test_normalize()
 
         print("\n🎉 All tests completed successfully!")
         print("📁 Test charts saved in current directory:")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Per-user analytics for StaticFruit bettors.
+
+One grouped pass over the bets frame produces, per user: bet count, total
+and median stake, markets touched, first/last activity, share of stake on
+YES and, for bets in resolved markets, realized PnL and hit rate.
+"""
+import numpy as np
+import pandas as pd
+
+# Columns the leaderboard can be ranked by, with chart labels
+RANK_COLUMNS = {
+    "bet_amount": "Total FRUIT Staked",
+    "bets": "Bet Count",
+    "median_bet": "Median FRUIT per Bet",
+    "markets": "Markets Touched",
+    "yes_share": "Share of Stake on YES",
+    "realized_pnl": "Realized FRUIT PnL",
+    "hit_rate": "Hit Rate (resolved bets)",
+}
+
+
+# Additive per-user columns, which aggregates.aggregate() can also produce (sharded)
+TOTAL_COLUMNS = ["bets", "bet_amount", "yes_stake", "markets", "first_ts", "last_ts"]
+COLUMNS = ["user", "bets", "bet_amount", "median_bet", "markets", "first_ts", "last_ts",
+           "realized_pnl", "resolved_bets", "hit_rate", "yes_share"]
+
+
+def user_table(bets, settled_bets=None, totals=None):
+    """Per-user analytics; `settled_bets` is settlement.settle()'s per-bet frame (same index as bets).
+
+    `totals` is aggregates.aggregate()'s user_totals; when given, only the
+    non-additive columns (median, PnL, hit rate) are grouped here.
+    """
+    frame = bets[["user", "market_id", "ts", "bet_amount"]].assign(
+        yes_stake=bets["bet_amount"].where(bets["outcome"] == 1, 0.0)
+    )
+    if settled_bets is not None and not settled_bets.empty:
+        frame["pnl"] = settled_bets["pnl"]
+        frame["won"] = settled_bets["won"].astype("float64")
+    else:
+        frame["pnl"] = np.nan
+        frame["won"] = np.nan
+
+    spec = dict(
+        median_bet=("bet_amount", "median"),
+        realized_pnl=("pnl", "sum"),
+        resolved_bets=("won", "count"),
+        hit_rate=("won", "mean"),
+    )
+    if totals is None:
+        spec.update(
+            bets=("bet_amount", "size"),
+            bet_amount=("bet_amount", "sum"),
+            yes_stake=("yes_stake", "sum"),
+            markets=("market_id", "nunique"),
+            first_ts=("ts", "min"),
+            last_ts=("ts", "max"),
+        )
+    users = frame.groupby("user", observed=True).agg(**spec)
+    users.index = users.index.astype(str)
+    if totals is not None:
+        users = totals.set_index("user")[TOTAL_COLUMNS].join(users)
+    # a sum over no resolved bets is 0; leave it missing so rankings skip those users
+    users["realized_pnl"] = users["realized_pnl"].where(users["resolved_bets"] > 0)
+    users["yes_share"] = (users["yes_stake"] / users["bet_amount"].where(users["bet_amount"] > 0)).astype("float32")
+    users["hit_rate"] = users["hit_rate"].astype("float32")
+    for col in ("bets", "markets", "resolved_bets"):
+        users[col] = pd.to_numeric(users[col], downcast="integer")
+    users.index.name = "user"
+    return users.reset_index()[COLUMNS]
+
+
+def write_table(users, path_stem):
+    """Write the table as Parquet (compact, columnar); falls back to CSV without pyarrow."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        users.to_csv(path_stem + ".csv", index=False)
+        return path_stem + ".csv"
+    users.to_parquet(path_stem + ".parquet", index=False)
+    return path_stem + ".parquet"
+
+
+def leaderboard(users, rank_by="bet_amount", n=25):
+    """Top `n` users by `rank_by` (users with no value for it are left out)."""
+    ranked = users.dropna(subset=[rank_by]).sort_values(rank_by, ascending=False, kind="stable")
+    return ranked[["user", rank_by]].head(n).reset_index(drop=True)